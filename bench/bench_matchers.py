@@ -0,0 +1,207 @@
+"""Microbenchmark for rekit/matchers.py.
+
+Generates a synthetic Rekit project (10k files by default) in a temp folder and compares
+the original per-call regex predicates and per-pattern line scanning against the
+precompiled matchers and the single pass content scanner.
+
+  python bench/bench_matchers.py [--files 10000] [--repeat 5]
+"""
+import argparse
+import codecs
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rekit import matchers  # noqa: E402
+
+COMPONENT_TPL = """import React, { PureComponent } from 'react';
+import PropTypes from 'prop-types';
+%(connect_imports)s
+export class %(name)s extends PureComponent {
+  static propTypes = {
+    %(feature)s: PropTypes.object.isRequired,
+  };
+
+  render() {
+    return (
+      <div className="%(feature)s-%(lower)s">
+        Component content: %(feature)s/%(name)s
+      </div>
+    );
+  }
+}
+%(connect)s"""
+
+CONNECT = """
+function mapStateToProps(state) {
+  return { %(feature)s: state.%(feature)s };
+}
+
+export default connect(mapStateToProps)(%(name)s);
+"""
+
+ACTION_TPL = """import { %(const)s } from './constants';
+
+export function %(action)s() {
+  return { type: %(const)s };
+}
+
+export function reducer(state, action) {
+  switch (action.type) {
+    case %(const)s:
+      return { ...state };
+    default:
+      return state;
+  }
+}
+"""
+
+TEST_TPL = """import { expect } from 'chai';
+import { %(name)s } from 'src/features/%(feature)s/%(name)s';
+
+describe('%(feature)s/%(name)s', () => {
+  it('renders node with correct class name', () => {
+    expect(1).to.equal(1);
+  });
+});
+"""
+
+def write(path, text):
+  folder = os.path.dirname(path)
+  if not os.path.exists(folder):
+    os.makedirs(folder)
+  with codecs.open(path, 'w', 'utf8') as f:
+    f.write(text)
+
+def make_project(root, count):
+  """Creates about `count` files: components, pages, actions and their tests and styles."""
+  paths = []
+  features = max(count // 200, 1)
+  perFeature = count // features
+  for i in range(features):
+    feature = 'feature%d' % i
+    base = os.path.join(root, 'src', 'features', feature)
+    actions = []
+    n = 0
+    while n < perFeature:
+      k = n // 5
+      name = 'Component%d' % k
+      page = k % 3 == 0
+      params = {
+        'name': name, 'feature': feature, 'lower': name.lower(),
+        'connect_imports': "import { connect } from 'react-redux';" if page else '',
+        'connect': CONNECT % {'name': name, 'feature': feature} if page else '',
+      }
+      action = 'doAction%d' % k
+      actions.append(action)
+      files = [
+        (os.path.join(base, name + '.js'), COMPONENT_TPL % params),
+        (os.path.join(base, name + '.less'), '.%s-%s {}\n' % (feature, name.lower())),
+        (os.path.join(base, 'redux', action + '.js'), ACTION_TPL % {'action': action, 'const': action.upper()}),
+        (os.path.join(root, 'test', 'app', 'features', feature, name + '.test.js'), TEST_TPL % params),
+        (os.path.join(root, 'test', 'app', 'features', feature, 'redux', action + '.test.js'), TEST_TPL % params),
+      ]
+      for path, text in files:
+        write(path, text)
+        paths.append(path)
+      n += len(files)
+    write(os.path.join(base, 'redux', 'actions.js'), ''.join("export { %s } from './%s';\n" % (a, a) for a in actions))
+    write(os.path.join(base, 'redux', 'reducer.js'), ''.join("import { reducer as %sReducer } from './%s';\n" % (a, a) for a in actions))
+    paths.append(os.path.join(base, 'redux', 'actions.js'))
+    paths.append(os.path.join(base, 'redux', 'reducer.js'))
+  return paths
+
+# The predicates and file parsing as they were before matchers.py
+
+def legacy_path_kind(path):
+  if re.search(r'src/features/[^/]+/redux/?$', path, re.I) is not None:
+    return 'redux'
+  if re.search(r'\/test\/.*\.test\.js$', path) is not None:
+    return 'test'
+  if re.search(r'src\/features\/[^\/]+\/redux', path) is not None:
+    return 'redux_element'
+  if re.search(r'\.js$|\.less$|\.scss$|\.css$', os.path.basename(path)) is None:
+    return 'other'
+  filename = os.path.basename(path)
+  if re.search(r'src\/components|src\/features', path) is not None \
+    and re.search(r'^([A-Z]+[a-z0-9]*)+\.', filename) is not None:
+    return 'component'
+  if re.search(r'^([A-Z]+[a-z0-9]+)+\.', filename) is not None:
+    return 'page'
+  return 'other'
+
+def legacy_scan_file(path):
+  classes = []
+  connected = False
+  functions = []
+  imports = []
+  with codecs.open(path, 'r', 'utf8') as f:
+    for line in f:
+      classes.extend(re.findall(r'class (\w+) extends', line))
+      functions.extend(re.findall(r'function (\w+)\(', line))
+      imports.extend(re.findall(r"'\./([^']+)';", line))
+      if not connected and re.search(r'export default connect\(', line) is not None:
+        connected = True
+  return matchers.FileFacts(frozenset(classes), connected, tuple(functions), frozenset(imports))
+
+def path_kind(path):
+  if matchers.REDUX_FOLDER_RE.search(path) is not None:
+    return 'redux'
+  if matchers.TEST_FILE_RE.search(path) is not None:
+    return 'test'
+  if matchers.REDUX_PATH_RE.search(path) is not None:
+    return 'redux_element'
+  filename = os.path.basename(path)
+  if matchers.SOURCE_EXT_RE.search(filename) is None:
+    return 'other'
+  if matchers.ELEMENT_FOLDER_RE.search(path) is not None \
+    and matchers.COMPONENT_NAME_RE.search(filename) is not None:
+    return 'component'
+  if matchers.PAGE_NAME_RE.search(filename) is not None:
+    return 'page'
+  return 'other'
+
+def best_of(repeat, fn, items):
+  best = None
+  result = None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    result = [fn(item) for item in items]
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best, result
+
+def report(label, legacy, current, count):
+  print('%-16s legacy %8.1f ms  matchers %8.1f ms  (%5.1f us/file, x%.2f)' % (
+    label, legacy * 1000, current * 1000, current * 1e6 / max(count, 1), legacy / current if current else 0))
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+  parser.add_argument('--files', type=int, default=10000)
+  parser.add_argument('--repeat', type=int, default=5)
+  args = parser.parse_args()
+
+  root = tempfile.mkdtemp(prefix='rekit-bench-')
+  try:
+    paths = [p.replace('\\', '/') for p in make_project(root, args.files)]
+    jsPaths = [p for p in paths if p.endswith('.js')]
+    print('%d files (%d js) in %s' % (len(paths), len(jsPaths), root))
+
+    legacyTime, legacyKinds = best_of(args.repeat, legacy_path_kind, paths)
+    currentTime, currentKinds = best_of(args.repeat, path_kind, paths)
+    assert legacyKinds == currentKinds, 'path predicates disagree'
+    report('path predicates', legacyTime, currentTime, len(paths))
+
+    legacyTime, legacyFacts = best_of(args.repeat, legacy_scan_file, jsPaths)
+    currentTime, currentFacts = best_of(args.repeat, matchers.scan_file, jsPaths)
+    assert legacyFacts == currentFacts, 'file facts disagree'
+    report('content scan', legacyTime, currentTime, len(jsPaths))
+  finally:
+    shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,243 @@
+"""Latency benchmark for the side bar predicates and menu visibility checks.
+
+Runs sidebar.py outside Sublime (with bench/stubs in place of the sublime modules) against
+a synthetic Rekit project and times every is_* predicate and every Rekit*Command.is_visible
+over the paths a user would right click. For each one it reports p50/p95/p99 latency and
+the number of file system calls per call, both cold (root, classify and file caches
+cleared before every call; the project index is built, as after a project is opened) and
+warm (caches populated).
+
+  python bench/bench_sidebar.py                      # print the report
+  python bench/bench_sidebar.py --save baseline.json # keep it as the baseline
+  python bench/bench_sidebar.py --baseline baseline.json
+
+With --baseline the run exits with status 1 if any p95 got slower than the baseline by
+more than --tolerance (and --floor microseconds), or if any call makes more file system
+calls than before.
+"""
+import argparse
+import builtins
+import collections
+import importlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, 'stubs'))
+sys.path.insert(0, BENCH_DIR)
+
+import sublime  # noqa: E402
+from bench_matchers import ACTION_TPL, COMPONENT_TPL, CONNECT, TEST_TPL, write  # noqa: E402
+
+PHASES = ('cold', 'warm')
+FS_CALLS = ('stat', 'lstat', 'listdir', 'scandir')
+
+def load_sidebar(cacheDir):
+  """Imports sidebar.py as a module of the 'Rekit' package, the way Sublime loads it."""
+  sublime.CACHE_PATH = cacheDir
+  package = types.ModuleType('Rekit')
+  package.__path__ = [PACKAGE_DIR]
+  sys.modules['Rekit'] = package
+  return importlib.import_module('Rekit.sidebar')
+
+def make_project(base, features, components, pages, actions, depth):
+  """Creates a Rekit project `depth` folders below base and returns (root, targets)."""
+  root = base
+  for i in range(depth):
+    root = os.path.join(root, 'dir%d' % i)
+  root = os.path.join(root, 'app')
+  write(os.path.join(root, 'tools/cli/templates/Page.js'), 'export class ${PAGE_NAME} extends Component {}\n')
+  write(os.path.join(root, 'test/cli/cli.test.js'), '')
+
+  targets = [base, root] + [os.path.join(root, p) for p in ('src', 'src/features', 'src/components', 'test', 'test/app', 'test/cli', 'test/cli/cli.test.js')]
+  for i in range(features):
+    feature = 'feature%d' % i
+    folder = os.path.join(root, 'src/features', feature)
+    testFolder = os.path.join(root, 'test/app/features', feature)
+    names = ['Component%d' % k for k in range(components)] + ['Page%d' % k for k in range(pages)]
+    for k, name in enumerate(names):
+      page = k >= components
+      params = {
+        'name': name, 'feature': feature, 'lower': name.lower(),
+        'connect_imports': "import { connect } from 'react-redux';" if page else '',
+        'connect': CONNECT % {'name': name, 'feature': feature} if page else '',
+      }
+      write(os.path.join(folder, name + '.js'), COMPONENT_TPL % params)
+      write(os.path.join(folder, name + '.less'), '.%s-%s {}\n' % (feature, name.lower()))
+      write(os.path.join(testFolder, name + '.test.js'), TEST_TPL % params)
+    names = ['doAction%d' % k for k in range(actions)]
+    for name in names:
+      write(os.path.join(folder, 'redux', name + '.js'), ACTION_TPL % {'action': name, 'const': name.upper()})
+      write(os.path.join(testFolder, 'redux', name + '.test.js'), TEST_TPL % {'name': name, 'feature': feature})
+    write(os.path.join(folder, 'redux/actions.js'), ''.join("export { %s } from './%s';\n" % (n, n) for n in names))
+    write(os.path.join(folder, 'redux/reducer.js'), ''.join("import { reducer as %sReducer } from './%s';\n" % (n, n) for n in names))
+    write(os.path.join(folder, 'redux/constants.js'), '')
+
+    # a sample of each kind of element, not every file
+    targets += [folder, os.path.join(folder, 'redux'), os.path.join(folder, 'redux/reducer.js'),
+      os.path.join(folder, 'redux/actions.js'), os.path.join(folder, 'redux/constants.js'), testFolder]
+    if components:
+      targets += [os.path.join(folder, 'Component0.js'), os.path.join(folder, 'Component0.less'),
+        os.path.join(testFolder, 'Component0.test.js')]
+    if pages:
+      targets += [os.path.join(folder, 'Page0.js'), os.path.join(testFolder, 'Page0.test.js')]
+    if actions:
+      targets += [os.path.join(folder, 'redux/doAction0.js'), os.path.join(testFolder, 'redux/doAction0.test.js')]
+  return root.replace('\\', '/'), [t.replace('\\', '/') for t in targets]
+
+class FsCounter(object):
+  """Counts file system calls by wrapping os.stat (behind os.path.*), os.listdir & co and open."""
+  def __init__(self):
+    self.count = 0
+    self.originals = {}
+
+  def wrap(self, owner, name):
+    original = getattr(owner, name, None)
+    if original is None:
+      return
+    def counted(*args, **kwargs):
+      self.count += 1
+      return original(*args, **kwargs)
+    self.originals[(owner, name)] = original
+    setattr(owner, name, counted)
+
+  def __enter__(self):
+    for name in FS_CALLS:
+      self.wrap(os, name)
+    self.wrap(builtins, 'open')
+    return self
+
+  def __exit__(self, *exc):
+    for (owner, name), original in self.originals.items():
+      setattr(owner, name, original)
+    self.originals = {}
+
+def get_probes(sidebar):
+  """Returns (name, fn(path)) for each predicate and each command visibility check."""
+  probes = []
+  for name, fn in sorted(vars(sidebar).items()):
+    if name.startswith('is_') and inspect.isfunction(fn) \
+      and list(inspect.signature(fn).parameters) == ['path']:
+      probes.append((name, fn))
+  commands = []
+  for name, cls in sorted(vars(sidebar).items()):
+    if name.startswith('Rekit') and name.endswith('Command') and 'is_visible' in vars(cls):
+      commands.append((name, cls(None)))
+  for name, command in commands:
+    probes.append((name + '.is_visible', lambda path, command=command: command.is_visible([path])))
+  # a right click evaluates every menu entry for the clicked path
+  probes.append(('menu', lambda path: [command.is_visible([path]) for _, command in commands]))
+  return probes
+
+def reset_caches(sidebar):
+  sidebar.invalidate_rekit_root_cache()
+  sidebar.invalidate_file_facts_cache()
+
+def percentile(samples, p):
+  samples = sorted(samples)
+  return samples[min(int(len(samples) * p / 100.0), len(samples) - 1)]
+
+def measure(sidebar, fn, targets, phase, rounds):
+  times = []
+  for _ in range(rounds):
+    for target in targets:
+      if phase == 'cold':
+        reset_caches(sidebar)
+      else:
+        fn(target)
+      start = time.perf_counter()
+      fn(target)
+      times.append((time.perf_counter() - start) * 1e6)
+
+  # counted separately so the wrappers don't add to the timings
+  calls = 0
+  with FsCounter() as counter:
+    for target in targets:
+      if phase == 'cold':
+        reset_caches(sidebar)
+      else:
+        fn(target)
+      counter.count = 0
+      fn(target)
+      calls += counter.count
+  return {
+    'p50': percentile(times, 50),
+    'p95': percentile(times, 95),
+    'p99': percentile(times, 99),
+    'fs_calls': calls / float(len(targets)),
+  }
+
+def wait_for_index(sidebar, root):
+  index = sidebar.get_project_index(root)
+  while not index.ready or index.building:
+    time.sleep(0.01)
+
+def compare(results, baseline, tolerance, floor):
+  regressions = []
+  for key, base in sorted(baseline.items()):
+    current = results.get(key)
+    if current is None:
+      continue
+    if current['p95'] > base['p95'] * tolerance + floor:
+      regressions.append('%s: p95 %.1f us, baseline %.1f us' % (key, current['p95'], base['p95']))
+    if current['fs_calls'] > base['fs_calls'] + 0.01:
+      regressions.append('%s: %.2f fs calls, baseline %.2f' % (key, current['fs_calls'], base['fs_calls']))
+  return regressions
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+  parser.add_argument('--features', type=int, default=20)
+  parser.add_argument('--components', type=int, default=20, help='components per feature')
+  parser.add_argument('--pages', type=int, default=5, help='pages per feature')
+  parser.add_argument('--actions', type=int, default=20, help='actions per feature')
+  parser.add_argument('--depth', type=int, default=6, help='folders above the project root')
+  parser.add_argument('--rounds', type=int, default=20, help='samples per target')
+  parser.add_argument('--only', help='only probes whose name contains this')
+  parser.add_argument('--save', help='write the results to this json file')
+  parser.add_argument('--baseline', help='fail on regressions against this json file')
+  parser.add_argument('--tolerance', type=float, default=1.5, help='allowed p95 slowdown factor')
+  parser.add_argument('--floor', type=float, default=20, help='p95 slowdown always allowed, in us')
+  args = parser.parse_args()
+
+  base = tempfile.mkdtemp(prefix='rekit-bench-')
+  try:
+    root, targets = make_project(base, args.features, args.components, args.pages, args.actions, args.depth)
+    sidebar = load_sidebar(os.path.join(base, 'cache'))
+    wait_for_index(sidebar, root)
+    print('%d targets in %s' % (len(targets), root))
+
+    results = collections.OrderedDict()
+    print('%-44s %-5s %9s %9s %9s %9s' % ('probe', 'phase', 'p50 us', 'p95 us', 'p99 us', 'fs calls'))
+    for name, fn in get_probes(sidebar):
+      if args.only and args.only not in name:
+        continue
+      for phase in PHASES:
+        r = results[name + ':' + phase] = measure(sidebar, fn, targets, phase, args.rounds)
+        print('%-44s %-5s %9.1f %9.1f %9.1f %9.2f' % (name, phase, r['p50'], r['p95'], r['p99'], r['fs_calls']))
+
+    if args.save:
+      with open(args.save, 'w') as f:
+        json.dump(results, f, indent=2)
+      print('Saved to ' + args.save)
+    if args.baseline:
+      with open(args.baseline) as f:
+        baseline = json.load(f)
+      regressions = compare(results, baseline, args.tolerance, args.floor)
+      for r in regressions:
+        print('REGRESSION ' + r)
+      if regressions:
+        return 1
+      print('No regressions against ' + args.baseline)
+    return 0
+  finally:
+    shutil.rmtree(base, ignore_errors=True)
+
+if __name__ == '__main__':
+  sys.exit(main())
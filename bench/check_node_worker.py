@@ -0,0 +1,110 @@
+"""Checks the NodeWorker side of the rekit_worker.js protocol against bench/stubs/rekit_worker.py.
+
+  python bench/check_node_worker.py
+
+Covers responses matched to requests by id, the fallback to spawning node when writing
+to the worker fails and pending requests reported as failed when the worker dies.
+Exits with status 1 if a check fails.
+"""
+import os
+import sys
+import tempfile
+import threading
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_sidebar import load_sidebar  # noqa: E402
+
+STUB_WORKER = os.path.join(BENCH_DIR, 'stubs', 'rekit_worker.py')
+TIMEOUT = 10
+
+class Responses(object):
+  """Collects on_done responses by name."""
+  def __init__(self):
+    self.responses = {}
+    self.cond = threading.Condition()
+
+  def on_done(self, name):
+    def on_done(response):
+      with self.cond:
+        self.responses[name] = response
+        self.cond.notify_all()
+    return on_done
+
+  def wait(self, *names):
+    with self.cond:
+      self.cond.wait_for(lambda: all(n in self.responses for n in names), TIMEOUT)
+    return [self.responses.get(n) for n in names]
+
+def use_stub_worker(sidebar):
+  # the worker is run by python instead of node
+  from Rekit.rekit import node
+  binary = node.NodeBinary(sys.executable, 'stub')
+  sidebar.get_node_binary = lambda: binary
+  sidebar.get_worker_script = lambda: STUB_WORKER
+
+def check_ids(sidebar, root):
+  worker = sidebar.NodeWorker(root)
+  r = Responses()
+  try:
+    assert worker.request('hold', [], r.on_done('held'))
+    assert worker.request('add_component', ['home/Nav'], r.on_done('first'))
+    assert worker.request('add_page', ['home/Main'], r.on_done('second'))
+    held, first, second = r.wait('held', 'first', 'second')
+  finally:
+    worker.stop()
+  assert held is not None and held['output'] == 'held', held
+  assert first is not None and first['output'] == 'add_component home/Nav', first
+  assert second is not None and second['output'] == 'add_page home/Main', second
+  assert not worker.pending, worker.pending
+
+def check_fallback(sidebar, root):
+  worker = sidebar._workers[root] = sidebar.NodeWorker(root)
+  r = Responses()
+  spawned = []
+  sidebar.run_command = lambda command, **kwargs: spawned.append(command)
+  try:
+    assert worker.request('close', [], r.on_done('close'))
+    assert r.wait('close')[0] is not None
+    sidebar.start_script(root, 'add_feature', ['home'], lambda code, message: None)
+  finally:
+    sidebar.stop_node_worker(root)
+  assert len(spawned) == 1 and spawned[0][1:] == [root + '/tools/cli/add_feature.js', 'home'], spawned
+  assert not worker.pending, worker.pending
+
+def check_exit(sidebar, root):
+  worker = sidebar.NodeWorker(root)
+  r = Responses()
+  assert worker.request('hold', [], r.on_done('held'))
+  assert worker.request('die', [], r.on_done('die'))
+  held, died = r.wait('held', 'die')
+  for response in (held, died):
+    assert response is not None and not response['ok'] and response['code'] is None, response
+  assert not worker.pending, worker.pending
+  assert not worker.is_alive()
+
+CHECKS = [
+  ('responses are matched to requests by id', check_ids),
+  ('node is spawned when writing to the worker fails', check_fallback),
+  ('pending requests fail when the worker exits', check_exit),
+]
+
+def main():
+  base = tempfile.mkdtemp(prefix='rekit-worker-')
+  sidebar = load_sidebar(os.path.join(base, 'cache'))
+  sidebar.get_settings().set('use_node_worker', True)
+  use_stub_worker(sidebar)
+  root = base.replace('\\', '/')
+  failed = 0
+  for title, check in CHECKS:
+    try:
+      check(sidebar, root)
+      print('ok      ' + title)
+    except AssertionError as e:
+      failed += 1
+      print('FAILED  %s: %s' % (title, e))
+  return 1 if failed else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
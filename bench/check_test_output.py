@@ -0,0 +1,106 @@
+"""Checks rekit/testoutput.py on the output of `run_test.js all`: the app and cli suites back to back.
+
+  python bench/check_test_output.py
+
+Exits with status 1 if a check fails.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rekit import testoutput  # noqa: E402
+
+ROOT = '/project'
+
+APP_OUTPUT = '''
+  home/Hello
+    ✓ renders node with correct class name
+    ✓ counts clicks (120ms)
+    1) shows the title
+
+  home/redux/counterPlus
+    ✓ handles action type COUNTER_PLUS correctly
+
+
+  3 passing (180ms)
+  1 failing
+
+  1) home/Hello
+       shows the title:
+     AssertionError: expected false to be true
+      at Context.<anonymous> (test/app/features/home/Hello.test.js:21:5)
+
+'''
+
+CLI_OUTPUT = '''
+=============================== Coverage summary ===============================
+Statements   : 85.2% ( 460/540 )
+================================================================================
+
+  cli: add_feature
+    ✓ adds a feature folder (95ms)
+    1) adds the feature route
+    2) adds the feature reducer
+    - removes a feature
+
+
+  1 passing (300ms)
+  1 pending
+  2 failing
+
+  1) cli: add_feature
+       adds the feature route:
+     Error: route not found
+      at Context.<anonymous> (test/cli/add_feature.test.js:40:7)
+
+  2) cli: add_feature
+       adds the feature reducer:
+     Error: reducer not found
+      at Context.<anonymous> (test/cli/add_feature.test.js:52:7)
+'''
+
+def parse(*outputs):
+  parser = testoutput.TestOutputParser(ROOT, 'all')
+  for output in outputs:
+    for line in output.split('\n'):
+      parser.feed(line)
+  return dict((r.title, r) for r in parser.results)
+
+def check_one_suite():
+  results = parse(APP_OUTPUT)
+  assert len(results) == 4, sorted(results)
+  failed = results['home/Hello shows the title']
+  assert failed.status == 'failed', failed
+  assert (failed.file, failed.line) == (ROOT + '/test/app/features/home/Hello.test.js', 21), failed
+  assert results['home/Hello counts clicks'].duration == 120
+
+def check_two_suites():
+  results = parse(APP_OUTPUT, CLI_OUTPUT)
+  assert len(results) == 8, sorted(results)
+  assert results['home/Hello shows the title'].line == 21, results['home/Hello shows the title']
+  assert results['cli: add_feature adds a feature folder'].status == 'passed'
+  assert results['cli: add_feature removes a feature'].status == 'pending'
+  route = results['cli: add_feature adds the feature route']
+  reducer = results['cli: add_feature adds the feature reducer']
+  # failure numbers restart at 1) in the second suite
+  assert (route.status, route.file, route.line) == ('failed', ROOT + '/test/cli/add_feature.test.js', 40), route
+  assert (reducer.status, reducer.line) == ('failed', 52), reducer
+
+CHECKS = [
+  ('one suite', check_one_suite),
+  ('app and cli suites in one run', check_two_suites),
+]
+
+def main():
+  failed = 0
+  for title, check in CHECKS:
+    try:
+      check()
+      print('ok      ' + title)
+    except (AssertionError, KeyError) as e:
+      failed += 1
+      print('FAILED  %s: %r' % (title, e))
+  return 1 if failed else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,37 @@
+"""Stands in for rekit_worker.js: speaks its line-delimited JSON protocol with canned scripts.
+
+  hold   no response until the next request has been answered
+  close  closes stdin, responds and stays alive, so later writes fail
+  die    exits without responding
+  other  responds ok, with the script and args as output
+"""
+import json
+import os
+import sys
+import time
+
+def send(request, output):
+  sys.stdout.write(json.dumps({'id': request['id'], 'ok': True, 'code': 0, 'output': output, 'error': None}) + '\n')
+  sys.stdout.flush()
+
+def main():
+  held = []
+  for line in iter(sys.stdin.readline, ''):
+    request = json.loads(line)
+    script = os.path.basename(request['script'])
+    if script == 'hold':
+      held.append(request)
+      continue
+    if script == 'die':
+      sys.exit(3)
+    if script == 'close':
+      os.close(0)
+    send(request, ' '.join([script] + request.get('args', [])))
+    for r in held:
+      send(r, 'held')
+    held = []
+    if script == 'close':
+      time.sleep(60)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,61 @@
+"""Just enough of the sublime module to import and exercise sidebar.py outside the editor."""
+import tempfile
+import threading
+
+CACHE_PATH = tempfile.gettempdir()
+
+HIDDEN = PERSISTENT = DRAW_NO_FILL = DRAW_NO_OUTLINE = DRAW_EMPTY_AS_OVERWRITE = 0
+
+class Settings(dict):
+  def get(self, key, default=None):
+    return dict.get(self, key, default)
+
+  def set(self, key, value):
+    self[key] = value
+
+  def add_on_change(self, tag, callback):
+    pass
+
+  def clear_on_change(self, tag):
+    pass
+
+_settings = {}
+
+def load_settings(name):
+  return _settings.setdefault(name, Settings())
+
+def set_timeout(callback, delay=0):
+  timer = threading.Timer(delay / 1000.0, callback)
+  timer.daemon = True
+  timer.start()
+
+set_timeout_async = set_timeout
+
+def active_window():
+  return None
+
+def windows():
+  return []
+
+def status_message(message):
+  pass
+
+def error_message(message):
+  pass
+
+def ok_cancel_dialog(message, ok_title=''):
+  return False
+
+def cache_path():
+  return CACHE_PATH
+
+def load_resource(name):
+  raise IOError('resource not found: ' + name)
+
+def platform():
+  return 'linux'
+
+class Region(object):
+  def __init__(self, a, b=None):
+    self.a = a
+    self.b = a if b is None else b
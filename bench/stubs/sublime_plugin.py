@@ -0,0 +1,18 @@
+"""Base classes of the sublime_plugin module, for running sidebar.py outside the editor."""
+
+class WindowCommand(object):
+  def __init__(self, window=None):
+    self.window = window
+
+class TextCommand(object):
+  def __init__(self, view=None):
+    self.view = view
+
+class ApplicationCommand(object):
+  pass
+
+class EventListener(object):
+  pass
+
+class ViewEventListener(object):
+  pass
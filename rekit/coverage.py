@@ -0,0 +1,75 @@
+"""Per file coverage from the lcov.info reports written by the test scripts."""
+import collections
+import os
+import threading
+
+FileCoverage = collections.namedtuple('FileCoverage', ['path', 'lines_found', 'lines_hit', 'branches_found', 'branches_hit', 'offset'])
+
+class CoverageReport(object):
+  """Per file totals of an lcov.info file, read in one streaming pass.
+
+  Line hits are not kept: they are read back from the file's record, by offset, the first
+  time a file is shown in the coverage gutter.
+  """
+  def __init__(self, rekitRoot, lcovPath):
+    self.rekitRoot = rekitRoot
+    self.lcovPath = lcovPath
+    self.files = {}
+    self.uncovered = {}
+    self.lock = threading.Lock()
+
+  def parse(self):
+    record = None
+    offset = 0
+    with open(self.lcovPath, 'rb') as f:
+      for line in f:
+        start = offset
+        offset += len(line)
+        # DA/BRDA/FN lines are the bulk of the file and not needed for the totals
+        if line[:3] in (b'DA:', b'BRD', b'FN:', b'FND', b'FNF', b'FNH'):
+          continue
+        line = line.strip()
+        if line.startswith(b'SF:'):
+          path = line[3:].decode('utf8', 'replace')
+          if not os.path.isabs(path):
+            path = os.path.join(self.rekitRoot, path)
+          record = [path.replace('\\', '/'), 0, 0, 0, 0, start]
+        elif record is None:
+          continue
+        elif line.startswith(b'LF:'):
+          record[1] = int(line[3:])
+        elif line.startswith(b'LH:'):
+          record[2] = int(line[3:])
+        elif line.startswith(b'BRF:'):
+          record[3] = int(line[4:])
+        elif line.startswith(b'BRH:'):
+          record[4] = int(line[4:])
+        elif line == b'end_of_record':
+          self.files[record[0]] = FileCoverage(*record)
+          record = None
+    return self
+
+  def get_totals(self):
+    files = self.files.values()
+    return (sum(f.lines_found for f in files), sum(f.lines_hit for f in files),
+      sum(f.branches_found for f in files), sum(f.branches_hit for f in files))
+
+  def get_uncovered_lines(self, path):
+    coverage = self.files.get(path)
+    if coverage is None:
+      return None
+    with self.lock:
+      if path not in self.uncovered:
+        lines = []
+        with open(self.lcovPath, 'rb') as f:
+          f.seek(coverage.offset)
+          for line in f:
+            line = line.decode('utf8', 'replace').strip()
+            if line == 'end_of_record':
+              break
+            if line.startswith('DA:'):
+              parts = line[3:].split(',')
+              if len(parts) >= 2 and parts[1] == '0':
+                lines.append(int(parts[0]))
+        self.uncovered[path] = lines
+      return self.uncovered[path]
@@ -0,0 +1,136 @@
+"""Per project history of test runs, for slow, slowing down and flaky test reports.
+
+Runs are appended as json lines to one file per project by a single writer thread, which
+batches whatever is queued into one write per file. The file is cut back to the last
+`keep` runs once it holds twice as many.
+"""
+import codecs
+import collections
+import json
+import os
+import queue
+import threading
+
+TestStats = collections.namedtuple('TestStats', ['title', 'runs', 'failures', 'median', 'recent', 'before', 'flaky'])
+
+# "Trending up": mean of the last TREND_RUNS durations over the mean of the ones before
+TREND_RUNS = 3
+TREND_RATIO = 1.5
+TREND_MIN_MS = 20
+
+_queue = queue.Queue()
+_writer = []
+_writer_lock = threading.Lock()
+# path: number of runs in the file, counted on the first write
+_line_counts = {}
+
+def record(path, make_run, keep):
+  """Queues a run for `path`; make_run() returns it and is called on the writer thread."""
+  _queue.put((path, make_run, keep))
+  with _writer_lock:
+    if not _writer:
+      _writer.append(threading.Thread(target=write_runs, daemon=True))
+      _writer[0].start()
+
+def write_runs():
+  while True:
+    batch = [_queue.get()]
+    while True:
+      try:
+        batch.append(_queue.get_nowait())
+      except queue.Empty:
+        break
+    runs = collections.OrderedDict()
+    for path, make_run, keep in batch:
+      try:
+        run = make_run()
+      except Exception:
+        continue
+      runs.setdefault(path, ([], keep))[0].append(run)
+    for path, (items, keep) in runs.items():
+      append_runs(path, items, keep)
+
+def append_runs(path, runs, keep):
+  try:
+    folder = os.path.dirname(path)
+    if not os.path.isdir(folder):
+      os.makedirs(folder)
+    if path not in _line_counts:
+      _line_counts[path] = len(read_lines(path))
+    with codecs.open(path, 'a', 'utf8') as f:
+      f.write(''.join(json.dumps(run, separators=(',', ':')) + '\n' for run in runs))
+    _line_counts[path] += len(runs)
+    if _line_counts[path] > keep * 2:
+      lines = read_lines(path)[-keep:]
+      with codecs.open(path + '.tmp', 'w', 'utf8') as f:
+        f.write(''.join(lines))
+      os.replace(path + '.tmp', path)
+      _line_counts[path] = len(lines)
+  except OSError:
+    _line_counts.pop(path, None)
+
+def read_lines(path):
+  try:
+    with codecs.open(path, 'r', 'utf8') as f:
+      return [line for line in f if line.endswith('\n')]
+  except (IOError, UnicodeDecodeError):
+    return []
+
+def load(path):
+  """Returns the recorded runs, oldest first; a line cut short by a crash is skipped."""
+  runs = []
+  for line in read_lines(path):
+    try:
+      runs.append(json.loads(line))
+    except ValueError:
+      continue
+  return runs
+
+def median(values):
+  values = sorted(values)
+  n = len(values)
+  return values[n // 2] if n % 2 else (values[n // 2 - 1] + values[n // 2]) / 2.0
+
+def mean(values):
+  return sum(values) / float(len(values))
+
+def get_stats(runs):
+  """Returns TestStats by title. Each run is {"date", "fingerprint", "tests": [[title, status, ms]]}."""
+  durations = {}
+  statuses = {}
+  counts = collections.Counter()
+  failures = collections.Counter()
+  for run in runs:
+    for title, status, duration in run.get('tests', ()):
+      counts[title] += 1
+      if status == 'failed':
+        failures[title] += 1
+      if duration is not None:
+        durations.setdefault(title, []).append(duration)
+      if status in ('passed', 'failed'):
+        statuses.setdefault((title, run.get('fingerprint')), set()).add(status)
+  # source states a test both passed and failed in
+  flaky = collections.Counter(title for (title, fingerprint), seen in statuses.items() if len(seen) == 2)
+  stats = {}
+  for title, runCount in counts.items():
+    values = durations.get(title, [])
+    recent = before = None
+    if len(values) > TREND_RUNS:
+      recent = mean(values[-TREND_RUNS:])
+      before = mean(values[-TREND_RUNS * 3:-TREND_RUNS])
+    stats[title] = TestStats(title, runCount, failures[title], median(values) if values else None,
+      recent, before, flaky[title])
+  return stats
+
+def get_slowest(stats, limit=10):
+  found = [s for s in stats.values() if s.median is not None]
+  return sorted(found, key=lambda s: -s.median)[:limit]
+
+def get_trending(stats, limit=10):
+  found = [s for s in stats.values() if s.recent is not None
+    and s.recent >= s.before * TREND_RATIO and s.recent - s.before >= TREND_MIN_MS]
+  return sorted(found, key=lambda s: -(s.recent / max(s.before, 1)))[:limit]
+
+def get_flaky(stats, limit=20):
+  found = [s for s in stats.values() if s.flaky]
+  return sorted(found, key=lambda s: (-s.flaky, -s.failures, s.title))[:limit]
@@ -0,0 +1,87 @@
+"""Import dependencies between the js files of a Rekit project."""
+import codecs
+import collections
+import os
+import re
+import threading
+
+# import/export ... from '...', bare import '...' and require('...')
+IMPORT_FROM_RE = re.compile(r'''(?:^|[;\s])(?:import|export)\s[^;'"]*?from\s*['"]([^'"]+)['"]|(?:^|[;\s])import\s*['"]([^'"]+)['"]|require\(\s*['"]([^'"]+)['"]\s*\)''', re.M)
+
+class ImportGraph(object):
+  """Which js file imports which under src/ and test/app/ of a Rekit root.
+
+  Files are only re-parsed when their mtime changes, so an update is a stat sweep.
+  """
+  def __init__(self, rekitRoot):
+    self.rekitRoot = rekitRoot
+    self.files = {}
+    self.lock = threading.Lock()
+
+  def update(self):
+    with self.lock:
+      seen = set()
+      for folder in ('src', 'test/app'):
+        for dirpath, dirnames, filenames in os.walk(os.path.join(self.rekitRoot, folder)):
+          for filename in filenames:
+            if not filename.endswith('.js'):
+              continue
+            path = os.path.join(dirpath, filename).replace('\\', '/')
+            seen.add(path)
+            try:
+              mtime = os.path.getmtime(path)
+            except OSError:
+              continue
+            cached = self.files.get(path)
+            if cached is None or cached[0] != mtime:
+              self.files[path] = (mtime, self.parse(path))
+      for path in list(self.files.keys()):
+        if path not in seen:
+          del self.files[path]
+
+  def parse(self, path):
+    try:
+      text = codecs.open(path, 'r', 'utf8').read()
+    except (IOError, UnicodeDecodeError):
+      return []
+    imports = []
+    for m in IMPORT_FROM_RE.finditer(text):
+      resolved = self.resolve(path, m.group(1) or m.group(2) or m.group(3))
+      if resolved is not None:
+        imports.append(resolved)
+    return imports
+
+  def resolve(self, path, spec):
+    if spec.startswith('.'):
+      base = os.path.normpath(os.path.join(os.path.dirname(path), spec))
+    elif spec.startswith('src/'):
+      # webpack alias used by Rekit tests
+      base = os.path.join(self.rekitRoot, spec)
+    else:
+      return None
+    base = base.replace('\\', '/')
+    for candidate in (base, base + '.js', base + '/index.js'):
+      if candidate.endswith('.js') and os.path.isfile(candidate):
+        return candidate
+    return None
+
+  def get_affected_tests(self, changed):
+    with self.lock:
+      importedBy = collections.defaultdict(list)
+      for path, (mtime, imports) in self.files.items():
+        for imported in imports:
+          importedBy[imported].append(path)
+    # only tests run_test.js can run: existing files under test/, not ones deleted since the base
+    testDir = self.rekitRoot.replace('\\', '/') + '/test/'
+    affected = set()
+    pending = list(changed)
+    seen = set(pending)
+    while pending:
+      path = pending.pop()
+      if path.endswith('.test.js') and path.startswith(testDir) and os.path.isfile(path):
+        affected.add(path)
+      for dependent in importedBy.get(path, []):
+        if dependent not in seen:
+          seen.add(dependent)
+          pending.append(dependent)
+    return sorted(affected)
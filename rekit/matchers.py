@@ -0,0 +1,81 @@
+"""Precompiled path and content patterns used to recognize Rekit elements.
+
+Nothing here depends on the sublime modules, so it can be used and benchmarked outside
+the editor (see bench/bench_matchers.py).
+"""
+import codecs
+import collections
+import re
+
+# Paths, always '/' separated
+FEATURE_ELEMENT_RE = re.compile(r'src/features/\w+')
+COMPONENTS_FOLDER_RE = re.compile(r'src/components/?$', re.I)
+REDUX_FOLDER_RE = re.compile(r'src/features/[^/]+/redux/?$', re.I)
+REDUX_PATH_RE = re.compile(r'src\/features\/[^\/]+\/redux')
+TEST_FOLDER_RE = re.compile(r'\/test\/?$')
+APP_TEST_FOLDER_RE = re.compile(r'\/test/app\/?$')
+CLI_TEST_FOLDER_RE = re.compile(r'\/test/cli\/?$')
+SUB_TEST_FOLDER_RE = re.compile(r'\/test\/\w+')
+TEST_FILE_RE = re.compile(r'\/test\/.*\.test\.js$')
+ELEMENT_FOLDER_RE = re.compile(r'src\/components|src\/features')
+INDEXED_PATH_RE = re.compile(r'/src/features/[^/]+/(redux/)?[^/]+\.js$|/src/components/[^/]+\.js$|/test/app/.*\.test\.js$')
+TEST_FEATURE_RE = re.compile(r'/test/app/features/([^/]+)/')
+
+# File names
+EXT_RE = re.compile(r'\.\w+')
+SOURCE_EXT_RE = re.compile(r'\.js$|\.less$|\.scss$|\.css$')
+STYLE_EXT_RE = re.compile(r'\.less$|\.scss$|\.css$')
+COMPONENT_NAME_RE = re.compile(r'^([A-Z]+[a-z0-9]*)+\.')
+PAGE_NAME_RE = re.compile(r'^([A-Z]+[a-z0-9]+)+\.')
+NAME_SEPARATOR_RE = re.compile(r'[,\r\n]+')
+
+# Color codes in the output of node scripts
+ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+
+# Tools scripts whose output is echoed to the output panel
+ECHO_SCRIPT_RE = re.compile(r'run_test\.js|build\.js')
+
+# Everything the predicates need from a js file, found in a single pass:
+# declared classes, the connect() default export, function names and './x' re-exports.
+CONTENT_RE = re.compile(r"class (\w+) extends|(export default connect\()|function (\w+)\(|'\./([^'\n]+)';")
+SCAN_CHUNK = 64 * 1024
+
+FileFacts = collections.namedtuple('FileFacts', ['classes', 'connected', 'functions', 'imports'])
+
+def get_filename_without_ext(filename):
+  return EXT_RE.sub('', filename)
+
+def to_js_path(path):
+  # styles belong to the component with the same name
+  return STYLE_EXT_RE.sub('.js', path)
+
+def scan_text(text, classes, functions, imports):
+  connected = False
+  for m in CONTENT_RE.finditer(text):
+    if m.group(1):
+      classes.append(m.group(1))
+    elif m.group(2):
+      connected = True
+    elif m.group(3):
+      functions.append(m.group(3))
+    else:
+      imports.append(m.group(4))
+  return connected
+
+def scan_file(path):
+  """Returns the FileFacts of a js file, or None if it can't be read."""
+  classes = []
+  functions = []
+  imports = []
+  connected = False
+  try:
+    with codecs.open(path, 'r', 'utf8') as f:
+      while True:
+        # whole lines only, none of the patterns spans lines
+        lines = f.readlines(SCAN_CHUNK)
+        if not lines:
+          break
+        connected = scan_text(''.join(lines), classes, functions, imports) or connected
+  except (IOError, UnicodeDecodeError):
+    return None
+  return FileFacts(frozenset(classes), connected, tuple(functions), frozenset(imports))
@@ -0,0 +1,56 @@
+"""Finds the node binary: configured dirs and PATH first, then common install locations."""
+import collections
+import os
+import re
+import subprocess
+
+NodeBinary = collections.namedtuple('NodeBinary', ['path', 'version'])
+
+NODE_EXE = 'node.exe' if os.name == 'nt' else 'node'
+VERSION_RE = re.compile(r'^v?(\d+)\.(\d+)\.(\d+)')
+
+def get_nvm_dirs():
+  # the shell's current nvm version when Sublime was started from it, else the newest installed
+  dirs = []
+  if os.environ.get('NVM_BIN'):
+    dirs.append(os.environ['NVM_BIN'])
+  nvmDir = os.environ.get('NVM_DIR') or os.path.expanduser('~/.nvm')
+  versionsDir = os.path.join(nvmDir, 'versions', 'node')
+  try:
+    versions = os.listdir(versionsDir)
+  except OSError:
+    versions = []
+  versions = [v for v in versions if VERSION_RE.match(v)]
+  versions.sort(key=lambda v: tuple(int(n) for n in VERSION_RE.match(v).groups()), reverse=True)
+  dirs.extend(os.path.join(versionsDir, v, 'bin') for v in versions)
+  return dirs
+
+def get_install_dirs():
+  dirs = get_nvm_dirs()
+  dirs.append(os.path.join(os.environ.get('VOLTA_HOME') or os.path.expanduser('~/.volta'), 'bin'))
+  if os.name == 'nt':
+    for name in ('ProgramFiles', 'ProgramFiles(x86)'):
+      if os.environ.get(name):
+        dirs.append(os.path.join(os.environ[name], 'nodejs'))
+  else:
+    dirs.extend(['/usr/local/bin', '/opt/homebrew/bin', '/usr/bin', '/opt/local/bin'])
+  return dirs
+
+def get_version(path, startupinfo=None):
+  try:
+    output = subprocess.check_output([path, '--version'], stderr=subprocess.STDOUT, startupinfo=startupinfo, timeout=10)
+  except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+    return None
+  return output.decode('utf8', 'replace').strip() or None
+
+def find_node(dirs, startupinfo=None):
+  """Returns the NodeBinary of the first node found in dirs or the install dirs, else None."""
+  seen = set()
+  for folder in list(dirs) + get_install_dirs():
+    if not folder or folder in seen:
+      continue
+    seen.add(folder)
+    path = os.path.join(folder, NODE_EXE)
+    if os.path.isfile(path) and os.access(path, os.X_OK):
+      return NodeBinary(path, get_version(path, startupinfo))
+  return None
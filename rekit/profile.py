@@ -0,0 +1,85 @@
+"""Optional timing of the plugin's hot paths, kept in in-memory histograms.
+
+Off unless the "profile" setting is on. While off, the timed() wrappers and start()/stop()
+pairs cost one flag check and do not read the clock.
+"""
+import functools
+import threading
+import time
+
+enabled = False
+
+# Bucket i counts durations below 2**i microseconds, the last one everything slower.
+BUCKETS = 24
+
+class Histogram(object):
+  def __init__(self):
+    self.count = 0
+    self.total = 0.0
+    self.max = 0.0
+    self.buckets = [0] * BUCKETS
+
+  def add(self, seconds):
+    us = seconds * 1e6
+    self.count += 1
+    self.total += seconds
+    if seconds > self.max:
+      self.max = seconds
+    self.buckets[min(int(us).bit_length(), BUCKETS - 1)] += 1
+
+  def percentile(self, p):
+    """Upper bound of the bucket holding the p-th percentile, in seconds."""
+    rank = self.count * p / 100.0
+    seen = 0
+    for i, n in enumerate(self.buckets):
+      seen += n
+      if n and seen >= rank:
+        return min(2 ** i / 1e6, self.max)
+    return self.max
+
+_histograms = {}
+_lock = threading.Lock()
+
+def record(name, seconds):
+  with _lock:
+    histogram = _histograms.get(name)
+    if histogram is None:
+      histogram = _histograms[name] = Histogram()
+    histogram.add(seconds)
+
+def start():
+  return time.perf_counter() if enabled else None
+
+def stop(name, started):
+  if started is not None:
+    record(name, time.perf_counter() - started)
+
+def timed(name=None):
+  def decorator(fn):
+    label = name or fn.__qualname__
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+      if not enabled:
+        return fn(*args, **kwargs)
+      started = time.perf_counter()
+      try:
+        return fn(*args, **kwargs)
+      finally:
+        record(label, time.perf_counter() - started)
+    return wrapper
+  return decorator
+
+def reset():
+  with _lock:
+    _histograms.clear()
+
+def report(limit=30):
+  """Returns the report lines, the entries with the most total time first."""
+  with _lock:
+    items = [(name, h) for name, h in _histograms.items() if h.count]
+  items.sort(key=lambda item: item[1].total, reverse=True)
+  lines = ['%-48s %7s %10s %9s %9s %9s %9s' % ('', 'count', 'total ms', 'mean ms', 'p50 ms', 'p95 ms', 'max ms')]
+  for name, h in items[:limit]:
+    lines.append('%-48s %7d %10.1f %9.3f %9.3f %9.3f %9.3f' % (name[:48], h.count, h.total * 1000,
+      h.total * 1000 / h.count, h.percentile(50) * 1000, h.percentile(95) * 1000, h.max * 1000))
+  return lines
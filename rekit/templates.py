@@ -0,0 +1,170 @@
+"""Renders the templates in tools/cli/templates in process, to preview what the add_* scripts create.
+
+Templates use ${NAME} placeholders. Each one is split into literal and placeholder parts once
+and cached until the file changes, so rendering is a join.
+"""
+import codecs
+import collections
+import difflib
+import os
+import re
+import threading
+
+PLACEHOLDER_RE = re.compile(r'\$\{(\w+)\}')
+WORD_RE = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z0-9]+')
+
+FileChange = collections.namedtuple('FileChange', ['path', 'before', 'after', 'note'])
+
+# Template files of each element kind and where the rendered file goes, relative to the
+# element's folder ({src} = src/features/<feature> or src/components, {test} the same under test/app).
+ELEMENT_FILES = {
+  'component': [('Component.js', '{src}/{name}.js'), ('Component.less', '{src}/{name}.less'), ('ComponentTest.js', '{test}/{name}.test.js')],
+  'page': [('Page.js', '{src}/{name}.js'), ('Page.less', '{src}/{name}.less'), ('PageTest.js', '{test}/{name}.test.js')],
+  'action': [('Action.js', '{src}/redux/{name}.js'), ('ActionTest.js', '{test}/redux/{name}.test.js')],
+  'async_action': [('AsyncAction.js', '{src}/redux/{name}.js'), ('AsyncActionTest.js', '{test}/redux/{name}.test.js')],
+}
+
+class Template(object):
+  def __init__(self, text):
+    parts = PLACEHOLDER_RE.split(text)
+    # literals at even indexes, placeholder names at odd ones
+    self.literals = parts[0::2]
+    self.names = parts[1::2]
+
+  def render(self, context):
+    out = [self.literals[0]]
+    for name, literal in zip(self.names, self.literals[1:]):
+      out.append(context.get(name, '${%s}' % name))
+      out.append(literal)
+    return ''.join(out)
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+def load_template(path):
+  """Returns the compiled Template of a file, or None if there is no such template."""
+  try:
+    st = os.stat(path)
+  except OSError:
+    return None
+  key = (st.st_mtime, st.st_size)
+  with _templates_lock:
+    cached = _templates.get(path)
+  if cached is not None and cached[0] == key:
+    return cached[1]
+  try:
+    with codecs.open(path, 'r', 'utf8') as f:
+      template = Template(f.read())
+  except (IOError, UnicodeDecodeError):
+    return None
+  with _templates_lock:
+    _templates[path] = (key, template)
+  return template
+
+def get_words(name):
+  return [w.lower() for w in WORD_RE.findall(name)]
+
+def to_camel(name):
+  words = get_words(name)
+  return words[0] + ''.join(w.capitalize() for w in words[1:]) if words else name
+
+def to_pascal(name):
+  return ''.join(w.capitalize() for w in get_words(name)) or name
+
+def to_kebab(name):
+  return '-'.join(get_words(name)) or name
+
+def to_upper_snake(name):
+  return '_'.join(get_words(name)).upper() or name
+
+def add_names(context, role, name):
+  context[role + '_NAME'] = name
+  context['CAMEL_' + role + '_NAME'] = to_camel(name)
+  context['PASCAL_' + role + '_NAME'] = to_pascal(name)
+  context['KEBAB_' + role + '_NAME'] = to_kebab(name)
+  context['UPPER_SNAKE_' + role + '_NAME'] = to_upper_snake(name)
+
+def get_context(kind, feature, name):
+  context = {}
+  add_names(context, 'FEATURE', feature or '')
+  if kind in ('component', 'page'):
+    add_names(context, kind.upper(), to_pascal(name))
+  else:
+    add_names(context, 'ACTION', to_camel(name))
+    actionType = to_upper_snake((feature or '') + '_' + name)
+    context['ACTION_TYPE'] = actionType
+    for stage in ('BEGIN', 'SUCCESS', 'FAILURE', 'DISMISS_ERROR'):
+      context[stage + '_ACTION_TYPE'] = actionType + '_' + stage
+  return context
+
+def read_text(path):
+  try:
+    with codecs.open(path, 'r', 'utf8') as f:
+      return f.read()
+  except (IOError, UnicodeDecodeError):
+    return None
+
+def append_line(changes, path, line):
+  # the line the add_* scripts add to an index-like file, unless it is there already
+  if path in changes:
+    before, current = changes[path].before, changes[path].after
+  else:
+    before = current = read_text(path)
+  if current is None:
+    changes[path] = FileChange(path, None, line + '\n', None)
+  elif line not in current:
+    if current and not current.endswith('\n'):
+      current += '\n'
+    changes[path] = FileChange(path, before, current + line + '\n', 'approximate')
+
+def plan(root, kind, feature, names):
+  """Returns the FileChanges adding elements of `kind` is expected to make."""
+  changes = collections.OrderedDict()
+  for name in names:
+    plan_element(changes, root, kind, feature, name)
+  return list(changes.values())
+
+def plan_element(changes, root, kind, feature, name):
+  context = get_context(kind, feature, name)
+  name = to_pascal(name) if kind in ('component', 'page') else to_camel(name)
+  if feature:
+    src = 'src/features/' + feature
+    test = 'test/app/features/' + feature
+  else:
+    src = 'src/components'
+    test = 'test/app/components'
+  templatesDir = os.path.join(root, 'tools/cli/templates')
+  for templateName, target in ELEMENT_FILES[kind]:
+    path = os.path.join(root, target.format(src=src, test=test, name=name)).replace('\\', '/')
+    template = load_template(os.path.join(templatesDir, templateName))
+    if template is None:
+      changes[path] = FileChange(path, None, None, 'created by the script, no %s template' % templateName)
+    else:
+      changes[path] = FileChange(path, read_text(path), template.render(context), None)
+
+  folder = os.path.join(root, src).replace('\\', '/')
+  if kind in ('component', 'page'):
+    append_line(changes, folder + '/index.js', "export { default as %s } from './%s';" % (name, name))
+    append_line(changes, folder + '/style.less', "@import './%s.less';" % name)
+    if kind == 'page':
+      changes[folder + '/route.js'] = FileChange(folder + '/route.js', None, None, 'routes are added by the script')
+  else:
+    append_line(changes, folder + '/redux/actions.js', "export { %s } from './%s';" % (name, name))
+    changes[folder + '/redux/constants.js'] = FileChange(folder + '/redux/constants.js', None, None, 'action types are added by the script')
+    changes[folder + '/redux/reducer.js'] = FileChange(folder + '/redux/reducer.js', None, None, 'reducers are registered by the script')
+
+def format_changes(root, changes):
+  """Unified diff of the changes, paths relative to root."""
+  lines = []
+  for c in changes:
+    relPath = os.path.relpath(c.path, root).replace('\\', '/')
+    if c.after is None:
+      lines.append('*** %s: %s' % (relPath, c.note))
+      continue
+    title = 'new file' if c.before is None else 'changed' + (' (%s)' % c.note if c.note else '')
+    lines.append('*** %s: %s' % (relPath, title))
+    lines.extend(l.rstrip('\n') for l in difflib.unified_diff(
+      (c.before or '').splitlines(True), c.after.splitlines(True),
+      'a/' + relPath if c.before is not None else '/dev/null', 'b/' + relPath))
+    lines.append('')
+  return '\n'.join(lines)
@@ -0,0 +1,102 @@
+"""Parses mocha spec reporter output, as it streams in, into TestResults."""
+import collections
+import os
+import re
+
+from . import matchers
+
+PASSED_RE = re.compile('^(\\s*)[✓√]\\s+(.*?)(?:\\s+\\((\\d+)ms\\))?$')
+FAILED_RE = re.compile(r'^(\s*)(\d+)\) (.*)$')
+PENDING_RE = re.compile(r'^(\s*)- (.*)$')
+SUMMARY_RE = re.compile(r'^\s*(\d+) (passing|failing|pending)')
+LOCATION_RE = re.compile(r'([^\s()]+\.js):(\d+)')
+SLOW_TEST_MS = 75
+
+TestResult = collections.namedtuple('TestResult', ['title', 'status', 'duration', 'file', 'line'])
+
+class TestOutputParser(object):
+  """Parses the output of one run_test.js process into TestResults."""
+  def __init__(self, rekitRoot, target):
+    self.rekitRoot = rekitRoot
+    self.target = target
+    self.suites = []
+    self.results = []
+    self.failures = {}
+    self.current = None
+    self.summary = False
+
+  def get_target_file(self):
+    # a run of a single test file is the location of all its failures
+    if self.target.endswith('.test.js'):
+      return os.path.join(self.rekitRoot, 'test', self.target).replace('\\', '/')
+    return None
+
+  def get_title(self, indent, title):
+    while self.suites and self.suites[-1][0] >= indent:
+      self.suites.pop()
+    return ' '.join([s[1] for s in self.suites] + [title])
+
+  def feed(self, line):
+    line = matchers.ANSI_RE.sub('', line).rstrip()
+    if not line.strip():
+      return
+    if SUMMARY_RE.match(line):
+      self.summary = True
+      return
+    if self.summary:
+      if not self.is_next_suite(line):
+        self.feed_failure_details(line)
+        return
+      # run_test.js all runs the app and cli suites in one process, failures are numbered per suite
+      self.summary = False
+      self.failures = {}
+      self.current = None
+      self.suites = []
+
+    m = PASSED_RE.match(line)
+    if m:
+      duration = int(m.group(3)) if m.group(3) else None
+      self.results.append(TestResult(self.get_title(len(m.group(1)), m.group(2)), 'passed', duration, None, None))
+      return
+    m = FAILED_RE.match(line)
+    if m:
+      self.failures[m.group(2)] = len(self.results)
+      self.results.append(TestResult(self.get_title(len(m.group(1)), m.group(3)), 'failed', None, self.get_target_file(), None))
+      return
+    m = PENDING_RE.match(line)
+    if m:
+      self.results.append(TestResult(self.get_title(len(m.group(1)), m.group(2)), 'pending', None, None, None))
+      return
+
+    indent = len(line) - len(line.lstrip())
+    if indent < 2:
+      # not mocha output
+      self.suites = []
+      return
+    self.get_title(indent, '')
+    self.suites.append((indent, line.strip()))
+
+  def is_next_suite(self, line):
+    # failure details are "  N) ..." headers and lines indented deeper, anything else
+    # after a summary is the output of the next suite
+    if PASSED_RE.match(line):
+      return True
+    indent = len(line) - len(line.lstrip())
+    m = FAILED_RE.match(line)
+    if m:
+      return indent > 2
+    return indent <= 2
+
+  def feed_failure_details(self, line):
+    m = FAILED_RE.match(line)
+    if m:
+      self.current = self.failures.get(m.group(2))
+      return
+    if self.current is None or self.results[self.current].line is not None:
+      return
+    m = LOCATION_RE.search(line)
+    if m and m.group(1).endswith('.test.js'):
+      path = m.group(1)
+      if not os.path.isabs(path):
+        path = os.path.join(self.rekitRoot, path)
+      self.results[self.current] = self.results[self.current]._replace(file=path.replace('\\', '/'), line=int(m.group(2)))
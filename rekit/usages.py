@@ -0,0 +1,175 @@
+"""Inverted index from identifiers to the js files of a Rekit project using them.
+
+Only the set of files per identifier is kept in memory; line numbers are read back from
+those files when a query is made, which keeps the index small and queries fast.
+
+The tokens of each file are saved with its mtime after a build, so the next session
+loads them and only re-reads the files changed in between.
+"""
+import codecs
+import collections
+import json
+import os
+import re
+import sys
+import threading
+
+IDENTIFIER_RE = re.compile(r'[A-Za-z_$][\w$]*')
+FOLDERS = ('src', 'test')
+# keywords and names in nearly every file, never looked up
+IGNORED = frozenset('''
+  async await break case catch class const continue debugger default delete do else export
+  extends false finally for from function if import in instanceof let new null of return
+  static super switch this throw true try typeof undefined var void while with yield
+  React Component PureComponent PropTypes props state render describe it expect
+'''.split())
+
+Usage = collections.namedtuple('Usage', ['path', 'line', 'text'])
+
+SNAPSHOT_VERSION = 1
+
+def read_tokens(path):
+  try:
+    with codecs.open(path, 'r', 'utf8') as f:
+      text = f.read()
+  except (IOError, UnicodeDecodeError):
+    return frozenset()
+  return frozenset(sys.intern(t) for t in set(IDENTIFIER_RE.findall(text)) if t not in IGNORED)
+
+class UsageIndex(object):
+  def __init__(self, root, snapshotPath=None):
+    self.root = root
+    self.snapshotPath = snapshotPath
+    self.loaded = False
+    # path: (mtime, tokens)
+    self.files = {}
+    # token: set of paths
+    self.postings = {}
+    self.lock = threading.Lock()
+    self.ready = threading.Event()
+    self.building = False
+    self.pending = False
+
+  def refresh(self):
+    with self.lock:
+      if self.building:
+        self.pending = True
+        return
+      self.building = True
+    threading.Thread(target=self.build).start()
+
+  def build(self):
+    if not self.loaded:
+      self.load_snapshot()
+      self.loaded = True
+    changed = False
+    while True:
+      changed = self.update() or changed
+      with self.lock:
+        if not self.pending:
+          self.building = False
+          break
+        self.pending = False
+    if changed:
+      self.save_snapshot()
+
+  def update(self):
+    # a stat sweep, only new and changed files are read; returns whether any were
+    seen = set()
+    changed = False
+    for folder in FOLDERS:
+      for dirpath, dirnames, filenames in os.walk(os.path.join(self.root, folder)):
+        for filename in filenames:
+          if filename.endswith('.js'):
+            path = os.path.join(dirpath, filename).replace('\\', '/')
+            seen.add(path)
+            changed = self.update_file(path) or changed
+    with self.lock:
+      removed = [p for p in self.files if p not in seen]
+    for path in removed:
+      changed = self.update_file(path) or changed
+    self.ready.set()
+    return changed
+
+  def update_file(self, path):
+    try:
+      mtime = os.path.getmtime(path)
+    except OSError:
+      mtime = None
+    with self.lock:
+      cached = self.files.get(path)
+    if (cached[0] if cached is not None else None) == mtime:
+      return False
+    tokens = read_tokens(path) if mtime is not None else None
+    with self.lock:
+      for token in self.files.pop(path, (None, ()))[1]:
+        paths = self.postings.get(token)
+        if paths is not None:
+          paths.discard(path)
+          if not paths:
+            del self.postings[token]
+      if tokens is not None:
+        self.add(path, mtime, tokens)
+    return True
+
+  def add(self, path, mtime, tokens):
+    self.files[path] = (mtime, tokens)
+    for token in tokens:
+      self.postings.setdefault(token, set()).add(path)
+
+  def load_snapshot(self):
+    if self.snapshotPath is None:
+      return
+    try:
+      with codecs.open(self.snapshotPath, 'r', 'utf8') as f:
+        data = json.load(f)
+      if data.get('version') != SNAPSHOT_VERSION or data.get('root') != self.root:
+        return
+      # tokens are stored once, files refer to them by position
+      tokens = [sys.intern(t) for t in data['tokens']]
+      files = [(self.root + '/' + relPath, mtime, frozenset(tokens[i] for i in ids))
+        for relPath, (mtime, ids) in data['files'].items()]
+    except (IOError, ValueError, KeyError, TypeError, IndexError, AttributeError):
+      return
+    with self.lock:
+      for path, mtime, fileTokens in files:
+        if path not in self.files:
+          self.add(path, mtime, fileTokens)
+
+  def save_snapshot(self):
+    if self.snapshotPath is None:
+      return
+    with self.lock:
+      files = list(self.files.items())
+    ids = {}
+    data = {}
+    for path, (mtime, tokens) in files:
+      data[path[len(self.root) + 1:]] = [mtime, [ids.setdefault(t, len(ids)) for t in tokens]]
+    tokens = sorted(ids, key=ids.get)
+    try:
+      folder = os.path.dirname(self.snapshotPath)
+      if not os.path.isdir(folder):
+        os.makedirs(folder)
+      with codecs.open(self.snapshotPath + '.tmp', 'w', 'utf8') as f:
+        json.dump({'version': SNAPSHOT_VERSION, 'root': self.root, 'tokens': tokens, 'files': data}, f, separators=(',', ':'))
+      os.replace(self.snapshotPath + '.tmp', self.snapshotPath)
+    except OSError:
+      pass
+
+  def find(self, name, exclude=()):
+    """Returns the Usages of an identifier outside the `exclude` files, by path and line."""
+    with self.lock:
+      paths = sorted(self.postings.get(name, ()))
+    pattern = re.compile(r'(?<![\w$])' + re.escape(name) + r'(?![\w$])')
+    usages = []
+    for path in paths:
+      if path in exclude:
+        continue
+      try:
+        with codecs.open(path, 'r', 'utf8') as f:
+          for i, line in enumerate(f):
+            if pattern.search(line) is not None:
+              usages.append(Usage(path, i + 1, line.strip()))
+      except (IOError, UnicodeDecodeError):
+        continue
+    return usages
@@ -0,0 +1,76 @@
+'use strict';
+
+// Long-lived helper used by the Rekit sublime plugin when "use_node_worker" is on.
+// It runs tools/cli scripts in-process so node and the modules they share are loaded
+// once per project instead of once per command.
+//
+// Protocol: one JSON request per line on stdin, one JSON response per line on stdout.
+//   request:  {"id": 1, "script": "/abs/path/tools/cli/add_feature.js", "args": ["home"]}
+//   response: {"id": 1, "ok": true, "code": 0, "output": "...", "error": null}
+
+const path = require('path');
+const readline = require('readline');
+
+const stdoutWrite = process.stdout.write;
+const stderrWrite = process.stderr.write;
+const exit = process.exit;
+const argv = process.argv;
+
+function ScriptExit(code) {
+  this.code = code;
+}
+
+function send(obj) {
+  stdoutWrite.call(process.stdout, JSON.stringify(obj) + '\n');
+}
+
+function runScript(request) {
+  const script = path.resolve(request.script);
+  const output = [];
+  const capture = (chunk) => {
+    output.push(String(chunk));
+    return true;
+  };
+  let code = 0;
+  let error = null;
+
+  process.stdout.write = capture;
+  process.stderr.write = capture;
+  process.exit = (c) => {
+    throw new ScriptExit(c || 0);
+  };
+  process.argv = [argv[0], script].concat(request.args || []);
+  try {
+    // Only the script itself is re-evaluated, everything it requires stays cached.
+    delete require.cache[script];
+    require(script);
+  } catch (e) {
+    if (e instanceof ScriptExit) {
+      code = e.code;
+    } else {
+      code = 1;
+      error = e && e.stack ? e.stack : String(e);
+    }
+  } finally {
+    process.stdout.write = stdoutWrite;
+    process.stderr.write = stderrWrite;
+    process.exit = exit;
+    process.argv = argv;
+  }
+
+  return { id: request.id, ok: code === 0, code, output: output.join(''), error };
+}
+
+const rl = readline.createInterface({ input: process.stdin });
+rl.on('line', (line) => {
+  if (!line.trim()) return;
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch (e) {
+    send({ id: null, ok: false, code: 1, output: '', error: 'Invalid request: ' + line });
+    return;
+  }
+  send(runScript(request));
+});
+rl.on('close', () => exit(0));
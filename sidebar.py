@@ -2,13 +2,17 @@
 import os
 import sublime
 import sublime_plugin
-import logging
 import functools
 import re
 import subprocess
 import threading
-import webbrowser
 import codecs
+import json
+import signal
+import collections
+import stat
+import time
+from .rekit import matchers, profile
 
 LOCAL_PATH = ''
 if not os.name == 'nt':
@@ -22,45 +26,147 @@ def main_thread(callback, *args, **kwargs):
   # most sublime.[something] calls need to be on the main thread
   sublime.set_timeout(functools.partial(callback, *args, **kwargs), 0)
 
+# Rekit.sublime-settings is loaded once, values are cached until the file changes.
+_settings = []
+_setting_values = {}
+
+def get_settings():
+  if not _settings:
+    settings = sublime.load_settings('Rekit.sublime-settings')
+    settings.clear_on_change('rekit')
+    settings.add_on_change('rekit', on_settings_change)
+    _settings.append(settings)
+  return _settings[0]
+
+def get_setting(name, default=None):
+  if name not in _setting_values:
+    _setting_values[name] = get_settings().get(name)
+  value = _setting_values[name]
+  return default if value is None else value
+
+def on_settings_change():
+  _setting_values.clear()
+  _node_env.clear()
+  del _node_binary[:]
+  profile.enabled = bool(get_setting('profile', False))
+  # a changed "coverage_gutter" replaces a toggle made with "Rekit: Toggle Coverage Gutter"
+  if _coverage_gutter and _coverage_gutter[1] != bool(get_setting('coverage_gutter', False)):
+    del _coverage_gutter[:]
+    views = [view for window in sublime.windows() for view in window.views()]
+    sublime.set_timeout_async(functools.partial(update_coverage_gutters, views), 0)
+
+_node_env = {}
+
+def get_node_env():
+  # built once, until the settings change
+  if _node_env:
+    return _node_env
+  envPATH = get_search_path()
+  npmDir = get_setting('npm_dir')
+  if npmDir and envPATH.find(npmDir) == -1:
+    envPATH = envPATH + os.pathsep + npmDir
+  # scripts spawning node themselves need to find the one found by get_node_binary()
+  binary = get_node_binary()
+  if binary is not None and envPATH.find(os.path.dirname(binary.path)) == -1:
+    envPATH = envPATH + os.pathsep + os.path.dirname(binary.path)
+
+  # https://docs.python.org/2/library/subprocess.html
+  # Note If specified, env must provide any variables required for the program to execute. 
+  # On Windows, in order to run a side-by-side assembly the specified env **must** include a valid SystemRoot.
+  envObj = {
+    'PATH': envPATH
+  }
+  if 'SYSTEMROOT' in os.environ:
+    envObj['SYSTEMROOT'] = os.environ['SYSTEMROOT']
+  _node_env.update(envObj)
+  return _node_env
+
+def get_search_path():
+  envPATH = os.environ.get('PATH', '') + LOCAL_PATH
+  nodeDir = get_setting('node_dir')
+  if nodeDir and envPATH.find(nodeDir) == -1:
+    envPATH = envPATH + os.pathsep + nodeDir
+  return envPATH
+
+# Absolute path and version of node, probed once per session and again when the settings change.
+_node_binary = []
+_node_binary_lock = threading.Lock()
+
+def get_node_binary():
+  with _node_binary_lock:
+    if not _node_binary:
+      from .rekit import node
+      dirs = [get_setting('node_dir')] + get_search_path().split(os.pathsep)
+      _node_binary.append(node.find_node(dirs, get_startupinfo()))
+    return _node_binary[0]
+
+def get_node_command(command):
+  # node commands run the resolved binary, no PATH lookup per spawn
+  if command and command[0] == 'node':
+    binary = get_node_binary()
+    if binary is None:
+      return None
+    return [binary.path] + command[1:]
+  return command
+
+def show_node_not_found():
+  sublime.error_message("Node binary could not be found in PATH, nvm, Volta or /usr/local\nConsider using the node_dir and npm_dir settings for the Rekit plugin\n\nPATH is: %s" % get_search_path())
+
+def get_startupinfo():
+  si = None
+  if hasattr(subprocess, "STARTUPINFO"):
+    si = subprocess.STARTUPINFO()
+    si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+  return si
+
 class CommandThread(threading.Thread):
-  def __init__(self, command, on_done, working_dir=None, shell="", env={}):
+  def __init__(self, command, on_done, working_dir=None, shell="", env={}, on_exit=None, on_line=None, echo=True):
     threading.Thread.__init__(self)
     self.command = command
+    self.echo = echo
     self.on_done = on_done
+    self.on_exit = on_exit
+    self.on_line = on_line
+    self.returncode = None
+    self.process = None
+    self.cancelled = False
     self.working_dir = working_dir
     self.shell = shell
     self.env = os.environ.copy()
     self.env.update(env)
 
+  def cancel(self):
+    self.cancelled = True
+    kill_process_tree(self.process)
+
   def run(self):
-    si = None
-    if hasattr(subprocess, "STARTUPINFO"):
-      si = subprocess.STARTUPINFO()
-      si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    si = get_startupinfo()
+    name = os.path.basename(self.command[1]) if len(self.command) > 1 else self.command[0]
+    started = profile.start()
+    firstLine = started
 
     try:
       #si.wShowWindow = subprocess.SW_HIDE # default
-      envPATH = os.environ['PATH'] + LOCAL_PATH
-      s = sublime.load_settings("Rekit.sublime-settings")
-      if s.get('node_dir') and envPATH.find(s.get('node_dir')) == -1:
-        envPATH = envPATH + os.pathsep + s.get('node_dir')
-      if s.get('npm_dir') and envPATH.find(s.get('npm_dir')) == -1:
-        envPATH = envPATH + os.pathsep + s.get('npm_dir')
-
-      # https://docs.python.org/2/library/subprocess.html
-      # Note If specified, env must provide any variables required for the program to execute. 
-      # On Windows, in order to run a side-by-side assembly the specified env **must** include a valid SystemRoot.
-      envObj = {
-        'PATH': envPATH,
-        'SYSTEMROOT': os.environ['SYSTEMROOT']
-      }
-      
-      p = subprocess.Popen(self.command, cwd=self.working_dir, env=envObj, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, startupinfo=si)
+      command = get_node_command(self.command)
+      if command is None:
+        main_thread(show_node_not_found)
+        return
+      # own process group so the whole tree can be killed on cancel
+      p = subprocess.Popen(command, cwd=self.working_dir, env=get_node_env(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, startupinfo=si, start_new_session=os.name != 'nt')
+      self.process = p
+      if self.cancelled:
+        kill_process_tree(p)
       for line in iter(p.stdout.readline, b''):
+        if firstLine is not None:
+          profile.stop('spawn to first output: ' + name, firstLine)
+          firstLine = None
         line2 = line.decode().strip('\r\n')
         # only show output for mocha     
-        if re.search(r'run_test\.js|build\.js', self.command[1]) is not None:
+        if self.echo and matchers.ECHO_SCRIPT_RE.search(self.command[1]) is not None:
           show_rekit_output(line2)
+        if self.on_line:
+          self.on_line(line2)
+      self.returncode = p.wait()
       if self.on_done:
         self.on_done()
 
@@ -72,7 +178,7 @@ class CommandThread(threading.Thread):
 
     except OSError as e:
       if e.errno == 2:
-        main_thread(sublime.error_message, "Node binary could not be found in PATH\nConsider using the node_dir and npm_dir settings for the Rekit plugin\n\nPATH is: %s" % os.environ['PATH'])
+        main_thread(show_node_not_found)
       else:
         show_rekit_output('running node failed:')
         show_rekit_output(str(e))
@@ -82,7 +188,13 @@ class CommandThread(threading.Thread):
       show_rekit_output('running node failed:')
       show_rekit_output(str(e))
 
-def run_command(command, callback=None, show_status=True, filter_empty_args=True, cwd=None, **kwargs):
+    finally:
+      profile.stop('command: ' + name, started)
+      # returncode stays None when node couldn't be run at all
+      if self.on_exit:
+        self.on_exit(self.returncode)
+
+def run_command(command, callback=None, show_status=True, filter_empty_args=True, cwd=None, serial=None, coalesce=True, limit=None, **kwargs):
   if filter_empty_args:
     command = [arg for arg in command if arg]
   
@@ -94,167 +206,891 @@ def run_command(command, callback=None, show_status=True, filter_empty_args=True
   # if command[0] == 'npm' and npm_cmd:
   #   command[0] = npm_cmd
 
-  thread = CommandThread(command, callback, working_dir=cwd, **kwargs)
-  thread.start()
+  return scheduler.submit(command, callback, cwd, serial, coalesce, limit, kwargs)
+
+def kill_process_tree(process):
+  if process is None or process.poll() is not None:
+    return
+  try:
+    if os.name == 'nt':
+      subprocess.call(['taskkill', '/F', '/T', '/PID', str(process.pid)], startupinfo=get_startupinfo())
+    else:
+      os.killpg(process.pid, signal.SIGTERM)
+  except OSError:
+    pass
+
+class CommandJob(object):
+  def __init__(self, command, cwd, serial, coalesce, limit, kwargs):
+    self.command = command
+    self.cwd = cwd
+    self.serial = serial
+    self.coalesce = coalesce
+    self.limit = limit
+    self.kwargs = kwargs
+    self.on_done = []
+    self.on_exit = []
+    self.on_line = []
+    self.thread = None
+    self.cancelled = False
+    self.queued = time.time()
+    self.started = None
+    self.finished = None
+
+  def key(self):
+    return (tuple(self.command), self.cwd)
+
+  def describe(self):
+    return ' '.join(os.path.basename(arg) if os.path.isabs(arg) else arg for arg in self.command)
+
+  def wall_time(self):
+    if self.started is None:
+      return 0
+    return (self.finished or time.time()) - self.started
+
+class CommandScheduler(object):
+  """Runs node commands with a cap on how many run at once.
+
+  Commands sharing a `serial` key (the Rekit root for scaffolding scripts) never run at
+  the same time, and unless `coalesce` is off, a command identical to one still waiting in
+  the queue is merged into it. A job's `limit` raises the cap for itself, which is how
+  sharded test runs get one process per shard.
+  """
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.queue = []
+    self.running = []
+    self.history = collections.deque(maxlen=20)
+
+  def submit(self, command, callback, cwd, serial, coalesce, limit, kwargs):
+    on_exit = kwargs.pop('on_exit', None)
+    on_line = kwargs.pop('on_line', None)
+    with self.lock:
+      job = None
+      if coalesce:
+        for queued in self.queue:
+          if queued.coalesce and queued.serial == serial and queued.key() == (tuple(command), cwd):
+            job = queued
+            break
+      if job is None:
+        job = CommandJob(command, cwd, serial, coalesce, limit, kwargs)
+        self.queue.append(job)
+      if callback:
+        job.on_done.append(callback)
+      if on_exit:
+        job.on_exit.append(on_exit)
+      if on_line:
+        job.on_line.append(on_line)
+    self.pump()
+    return job
+
+  def pump(self):
+    limit = max(get_setting('max_running_commands', 2), 1)
+    started = []
+    with self.lock:
+      # an identical command is never started twice either
+      busy = set(job.serial or job.key() for job in self.running)
+      for job in list(self.queue):
+        if len(self.running) >= max(limit, job.limit or 0):
+          continue
+        if (job.serial or job.key()) in busy:
+          continue
+        self.queue.remove(job)
+        self.running.append(job)
+        busy.add(job.serial or job.key())
+        job.started = time.time()
+        job.thread = CommandThread(job.command, functools.partial(self.on_job_done, job), working_dir=job.cwd,
+          on_exit=functools.partial(self.on_job_exit, job), on_line=functools.partial(self.on_job_line, job), **job.kwargs)
+        started.append(job)
+    for job in started:
+      job.thread.start()
+    self.show_status()
+
+  def on_job_done(self, job):
+    if not job.cancelled:
+      for callback in job.on_done:
+        callback()
+
+  def on_job_line(self, job, line):
+    for on_line in job.on_line:
+      on_line(line)
+
+  def on_job_exit(self, job, code):
+    job.finished = time.time()
+    with self.lock:
+      if job in self.running:
+        self.running.remove(job)
+      self.history.append(job)
+    for on_exit in job.on_exit:
+      on_exit(None if job.cancelled else code)
+    self.pump()
+
+  def cancel(self):
+    with self.lock:
+      jobs = self.queue + self.running
+    for job in jobs:
+      self.cancel_job(job)
+
+  def cancel_job(self, job):
+    with self.lock:
+      queued = job in self.queue
+      if queued:
+        self.queue.remove(job)
+    job.cancelled = True
+    if queued:
+      # let callers waiting on it (e.g. script batches) know it won't run
+      for on_exit in job.on_exit:
+        on_exit(None)
+    elif job.thread is not None:
+      job.thread.cancel()
+    self.show_status()
+
+  def queue_depth(self):
+    return len(self.queue)
+
+  def show_status(self):
+    with self.lock:
+      running = len(self.running)
+      queued = len(self.queue)
+    if running or queued:
+      main_thread(sublime.status_message, 'Rekit: %d running, %d queued' % (running, queued))
+
+  def report(self):
+    with self.lock:
+      lines = ['Running:']
+      lines += ['  %s (%.1fs)' % (job.describe(), job.wall_time()) for job in self.running] or ['  none']
+      lines.append('Queued: %d' % len(self.queue))
+      lines += ['  %s' % job.describe() for job in self.queue]
+      lines.append('Recently finished:')
+      lines += ['  %s (%.1fs%s)' % (job.describe(), job.wall_time(), ', cancelled' if job.cancelled else '') for job in reversed(self.history)] or ['  none']
+    return lines
+
+scheduler = CommandScheduler()
+
+class NodeWorker(object):
+  """A long-lived `node rekit_worker.js` process running tools/cli scripts for one Rekit root.
+
+  Requests and responses are line-delimited JSON matched by id, see rekit_worker.js.
+  """
+  def __init__(self, root):
+    self.root = root
+    self.process = None
+    self.lock = threading.Lock()
+    self.nextId = 0
+    self.pending = {}
+
+  def is_alive(self):
+    return self.process is not None and self.process.poll() is None
+
+  def start(self):
+    command = get_node_command(['node', get_worker_script()])
+    if command is None:
+      raise OSError(2, 'node not found')
+    self.process = subprocess.Popen(command, cwd=self.root, env=get_node_env(),
+      stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, startupinfo=get_startupinfo())
+    threading.Thread(target=self.read, args=(self.process,)).start()
+
+  def request(self, script, args, on_done):
+    # Returns False when the worker is not usable so the caller can spawn node itself.
+    with self.lock:
+      try:
+        if not self.is_alive():
+          self.start()
+        self.nextId += 1
+        self.pending[self.nextId] = on_done
+        line = json.dumps({'id': self.nextId, 'script': script, 'args': args}) + '\n'
+        self.process.stdin.write(line.encode('utf8'))
+        self.process.stdin.flush()
+        return True
+      except (OSError, IOError, ValueError):
+        self.pending.pop(self.nextId, None)
+        self.stop()
+        return False
+
+  def read(self, process):
+    for line in iter(process.stdout.readline, b''):
+      try:
+        response = json.loads(line.decode('utf8'))
+      except ValueError:
+        continue
+      with self.lock:
+        on_done = self.pending.pop(response.get('id'), None)
+      if on_done is not None:
+        on_done(response)
+
+    # The worker died: requests already sent may have been half applied, so they are
+    # reported as failed rather than replayed.
+    with self.lock:
+      if self.process is process:
+        self.process = None
+      pending = list(self.pending.values())
+      self.pending.clear()
+    for on_done in pending:
+      on_done({'ok': False, 'code': None, 'output': '', 'error': 'Rekit node worker exited unexpectedly'})
+
+  def stop(self):
+    process = self.process
+    self.process = None
+    if process is not None and process.poll() is None:
+      # closing stdin fails when the pipe is broken, the process is terminated anyway
+      try:
+        process.stdin.close()
+      except (OSError, IOError):
+        pass
+      try:
+        process.terminate()
+      except (OSError, IOError):
+        pass
+
+def get_worker_script():
+  script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rekit_worker.js')
+  if os.path.exists(script):
+    return script
+  # Installed as a .sublime-package zip: node needs a real file.
+  script = os.path.join(sublime.cache_path(), 'Rekit', 'rekit_worker.js')
+  if not os.path.exists(script):
+    if not os.path.isdir(os.path.dirname(script)):
+      os.makedirs(os.path.dirname(script))
+    with codecs.open(script, 'w', 'utf8') as f:
+      f.write(sublime.load_resource('Packages/Rekit/rekit_worker.js'))
+  return script
+
+_workers = {}
+
+def get_node_worker(root):
+  worker = _workers.get(root)
+  if worker is None:
+    worker = _workers[root] = NodeWorker(root)
+  return worker
+
+def stop_node_worker(root):
+  worker = _workers.pop(root, None)
+  if worker is not None:
+    worker.stop()
+
+def start_script(rekitRoot, name, args, on_exit):
+  # on_exit(code, message) is called once the script finishes, code is None if it couldn't run.
+  js_file = os.path.join(rekitRoot, 'tools/cli', name + '.js').replace('\\', '/').replace('\\', '/')
+  if get_setting('use_node_worker') \
+    and get_node_worker(rekitRoot).request(js_file, args, functools.partial(on_worker_exit, on_exit)):
+    return
+  run_command(['node', js_file] + args, serial=rekitRoot, coalesce=False, on_exit=lambda code: on_exit(code, None))
+
+def on_worker_exit(on_exit, response):
+  on_exit(response.get('code'), response.get('error') or response.get('output'))
+
+class ScriptBatch(object):
+  """Runs tools/cli scripts one after another and refreshes the project index once at the end.
+
+  The scripts are never run in parallel: most of them edit files shared by a feature
+  (index.js, route.js, redux/actions.js...) and would overwrite each other's changes.
+  """
+  def __init__(self, rekitRoot, scripts, on_done=None):
+    self.rekitRoot = rekitRoot
+    self.scripts = scripts
+    self.on_done = on_done
+    self.results = []
+    self.verbose = len(scripts) > 1
+
+  def start(self):
+    if self.verbose:
+      show_rekit_output('Running %d Rekit scripts...' % len(self.scripts))
+    self.next()
+
+  def next(self):
+    if len(self.results) == len(self.scripts):
+      self.finish()
+      return
+    name, args = self.scripts[len(self.results)]
+    start_script(self.rekitRoot, name, args, self.on_script_exit)
+
+  def on_script_exit(self, code, message):
+    name, args = self.scripts[len(self.results)]
+    self.results.append(code == 0)
+    if self.verbose:
+      show_rekit_output('[%d/%d] %s %s: %s' % (len(self.results), len(self.scripts), name, ' '.join(args), 'done' if code == 0 else 'failed'))
+    if code != 0 and message:
+      show_rekit_output(message)
+    if code is None:
+      # node itself is not usable, no point trying the rest
+      self.results += [False] * (len(self.scripts) - len(self.results))
+    self.next()
+
+  def finish(self):
+    refresh_project_index(self.rekitRoot)
+    failed = self.results.count(False)
+    if self.verbose:
+      show_rekit_output('%d done, %d failed.' % (len(self.results) - failed, failed))
+    if self.on_done and failed == 0:
+      self.on_done()
+
+def run_scripts(path, scripts, on_done=None):
+  ScriptBatch(get_rekit_root(path), scripts, on_done).start()
 
 def run_script(path, name, args = [], on_done=None):
-  js_file = os.path.join(get_rekit_root(path), 'tools/cli', name + '.js').replace('\\', '/').replace('\\', '/')
-  run_command(['node', js_file] + args, callback=on_done)
+  run_scripts(path, [(name, args)], on_done)
+
+def parse_names(text):
+  # one or more names separated by commas or new lines
+  return [name.strip() for name in matchers.NAME_SEPARATOR_RE.split(text) if name.strip()]
+
+# Maps a directory (or file path) to the Rekit root containing it, or None.
+# Filled for every ancestor visited during a walk so later lookups are O(1).
+_root_cache = {}
+
+def check_rekit_root(path):
+  return os.path.exists(os.path.join(path, 'src/features').replace('\\', '/')) \
+    and os.path.exists(os.path.join(path, 'tools/cli/templates/Page.js').replace('\\', '/'))
+
+def invalidate_rekit_root_cache():
+  _root_cache.clear()
+  invalidate_classify_cache()
 
 def is_rekit_root(path):
   if path is None:
     return False
-  return os.path.exists(os.path.join(path, 'src/features').replace('\\', '/')) \
-    and os.path.exists(os.path.join(path, 'tools/cli/templates/Page.js').replace('\\', '/'))
+  return get_rekit_root(path) == path
 
 def get_rekit_root(path):
+  if path in _root_cache:
+    return _root_cache[path]
+  started = profile.start()
+  visited = []
+  root = None
   lastPath = None
-  while path != lastPath and not is_rekit_root(path):
+  while path != lastPath:
+    if path in _root_cache:
+      root = _root_cache[path]
+      break
+    visited.append(path)
+    if check_rekit_root(path):
+      root = path
+      break
     lastPath = path
     path = os.path.dirname(path)
-  if lastPath == path:
-    return None
-  else:
-    return path
+  for p in visited:
+    _root_cache[p] = root
+  profile.stop('get_rekit_root walk', started)
+  return root
 
 def get_filename_without_ext(path):
-  return re.sub(r'\.\w+', '', os.path.basename(path))
+  return matchers.get_filename_without_ext(os.path.basename(path))
 
 def get_feature_name(path):
   return path.split('src/features/')[1].split('/')[0]
 
+# Everything the sidebar needs to know about a path, computed in one pass by classify().
+# kind is one of: root, features, feature, components, redux, test_folder, app_test_folder,
+# cli_test_folder, sub_test_folder, test, reducer, action, async_action, component, page, other,
+# or None when the path is not inside a Rekit project.
+Classification = collections.namedtuple('Classification', ['kind', 'root', 'feature', 'name', 'test_target', 'coverage_report'])
+NOT_REKIT = Classification(None, None, None, None, None, None)
+
+# Classifications are reused while the path's mtime is unchanged, but only for a short while
+# since the kind of a file can also depend on its neighbours (e.g. actions.js).
+CLASSIFY_TTL = 2.0
+CLASSIFY_CACHE_SIZE = 1000
+_classify_cache = {}
+
+def classify(path):
+  try:
+    st = os.stat(path)
+    mtime = st.st_mtime
+    isdir = stat.S_ISDIR(st.st_mode)
+  except OSError:
+    mtime = None
+    isdir = False
+
+  now = time.time()
+  cached = _classify_cache.get(path)
+  if cached is not None and cached[0] == mtime and now - cached[1] < CLASSIFY_TTL:
+    return cached[2]
+
+  if mtime is None:
+    root = get_rekit_root(path)
+    if root in _indexes:
+      _indexes[root].forget(path)
+  c = classify_path(path, isdir)
+  if len(_classify_cache) >= CLASSIFY_CACHE_SIZE:
+    _classify_cache.clear()
+  _classify_cache[path] = (mtime, now, c)
+  return c
+
+def invalidate_classify_cache():
+  _classify_cache.clear()
+
+def classify_path(path, isdir):
+  root = get_rekit_root(path)
+  if root is None:
+    return NOT_REKIT
+
+  name = get_filename_without_ext(path)
+  feature = None
+  if matchers.FEATURE_ELEMENT_RE.search(path) is not None:
+    feature = get_feature_name(path)
+
+  featuresPath = os.path.join(root, 'src/features').replace('\\', '/')
+  kind = 'other'
+  coverageReport = None
+  if path == root:
+    kind = 'root'
+  elif path == featuresPath:
+    kind = 'features'
+  elif os.path.dirname(path) == featuresPath:
+    kind = 'feature'
+  elif matchers.COMPONENTS_FOLDER_RE.search(path) is not None:
+    kind = 'components'
+  elif matchers.REDUX_FOLDER_RE.search(path) is not None:
+    kind = 'redux'
+  elif isdir and matchers.TEST_FOLDER_RE.search(path) is not None:
+    kind = 'test_folder'
+    coverageReport = os.path.join(root, 'coverage', '', 'lcov-report/index.html')
+  elif isdir and matchers.APP_TEST_FOLDER_RE.search(path) is not None:
+    kind = 'app_test_folder'
+    coverageReport = os.path.join(root, 'coverage', 'app', 'lcov-report/index.html')
+  elif isdir and matchers.CLI_TEST_FOLDER_RE.search(path) is not None:
+    kind = 'cli_test_folder'
+    coverageReport = os.path.join(root, 'coverage', 'cli', 'lcov-report/index.html')
+  elif isdir and matchers.SUB_TEST_FOLDER_RE.search(path) is not None:
+    kind = 'sub_test_folder'
+  elif matchers.TEST_FILE_RE.search(path) is not None:
+    kind = 'test'
+  elif not isdir:
+    kind = get_project_index(root).get_kind(matchers.to_js_path(path))
+    if kind is None:
+      kind = classify_element(path, name, feature)
+
+  testTarget = None
+  if kind == 'reducer':
+    testTarget = os.path.join(root, 'test/app/features/%s/redux/reducer.test.js' % feature)
+  elif kind in ('action', 'async_action'):
+    testTarget = os.path.join(root, 'test/app/features/%s/redux/%s.test.js' % (feature, name))
+  elif kind in ('page', 'component') and feature is not None:
+    testTarget = os.path.join(root, 'test/app/features/%s/%s.test.js' % (feature, name))
+  elif kind == 'component':
+    testTarget = os.path.join(root, 'test/app/components/%s.test.js' % name)
+
+  return Classification(kind, root, feature, name, testTarget, coverageReport)
+
+def classify_element(path, name, feature):
+  filename = os.path.basename(path)
+  if matchers.REDUX_PATH_RE.search(path) is not None:
+    if filename == 'reducer.js' and matchers.REDUX_FOLDER_RE.search(os.path.dirname(path)) is not None:
+      return 'reducer'
+    actionsFacts = get_file_facts(os.path.join(os.path.dirname(path), 'actions.js'))
+    if actionsFacts is None or name not in actionsFacts.imports:
+      return 'other'
+    facts = get_file_facts(path)
+    if facts is None:
+      return 'other'
+    # TODO: check constants to make it more precise
+    functions = [f.lower() for f in facts.functions]
+    if name.lower() in functions and ('dismiss' + name + 'Error').lower() in functions:
+      return 'async_action'
+    return 'action'
+
+  if matchers.SOURCE_EXT_RE.search(filename) is None:
+    return 'other'
+  # Pages need at least one lowercase letter or digit after each capital, components don't.
+  isComponentName = matchers.ELEMENT_FOLDER_RE.search(path) is not None \
+    and matchers.COMPONENT_NAME_RE.search(filename) is not None
+  isPageName = matchers.PAGE_NAME_RE.search(filename) is not None
+  if not isComponentName and not isPageName:
+    return 'other'
+
+  facts = get_file_facts(matchers.to_js_path(path))
+  if facts is None or name not in facts.classes:
+    return 'other'
+
+  if facts.connected:
+    return 'page' if isPageName else 'other'
+  return 'component' if isComponentName else 'other'
+
+# What the predicates need to know about the content of a js file (see matchers.scan_file),
+# kept in an LRU cache keyed by (path, mtime, size) so each file is read once per change.
+_file_facts_cache = collections.OrderedDict()
+_file_facts_lock = threading.Lock()
+
+def get_file_facts(path):
+  try:
+    st = os.stat(path)
+  except OSError:
+    return None
+  key = (path, st.st_mtime, st.st_size)
+  with _file_facts_lock:
+    facts = _file_facts_cache.get(key)
+    if facts is not None:
+      _file_facts_cache.move_to_end(key)
+      return facts
+
+  started = profile.start()
+  facts = matchers.scan_file(path)
+  profile.stop('file facts read', started)
+  if facts is None:
+    return None
+
+  put_file_facts(key, facts)
+  return facts
+
+def put_file_facts(key, facts):
+  maxSize = get_setting('file_facts_cache_size', 500)
+  with _file_facts_lock:
+    _file_facts_cache[key] = facts
+    while len(_file_facts_cache) > max(maxSize, 1):
+      _file_facts_cache.popitem(last=False)
+
+def peek_file_facts(key):
+  # cached facts for (path, mtime, size), without reading the file or touching the LRU order
+  with _file_facts_lock:
+    return _file_facts_cache.get(key)
+
+def invalidate_file_facts_cache():
+  with _file_facts_lock:
+    _file_facts_cache.clear()
+
 def is_rekit_project(path):
   return get_rekit_root(path) is not None
 
 def is_feature(path):
-  return is_rekit_project(path) and os.path.dirname(path) == os.path.join(get_rekit_root(path), 'src/features').replace('\\', '/')
+  return classify(path).kind == 'feature'
 
 def is_features_folder(path):
-  return is_rekit_project(path) and path == os.path.join(get_rekit_root(path), 'src/features').replace('\\', '/')
+  return classify(path).kind == 'features'
 
 def is_feature_element(path):
-  return is_rekit_project(path) and re.search(r'src/features/\w+', path) is not None;
+  return classify(path).feature is not None
 
 def is_components_folder(path):
-  return is_rekit_project(path) and re.search(r'src/components/?$', path, re.I) is not None
-
-def is_page(path):
-  return False
+  return classify(path).kind == 'components'
 
 def is_component(path):
-  if not is_rekit_project(path):
-    return False
-  filename = os.path.basename(path)
-
-  if re.search(r'src\/components|src\/features', path) is None:
-    return False
-
-  if re.search(r'^([A-Z]+[a-z0-9]*)+\.', filename) is None:
-    return False
-
-  if re.search(r'\.js$|\.less$|\.scss$|\.css$', filename) is None:
-    return False
-
-  path = re.sub(r'\.less$|\.scss$|\.css$', '.js', path)
-  if not os.path.exists(path):
-    return False
-
-  text = codecs.open(path, 'r', 'utf8').read()
-  if re.search('class ' + get_filename_without_ext(filename) + ' extends', text, re.MULTILINE) is None:
-    return False
-
-  if re.search('export default connect\(', text, re.MULTILINE) is not None:
-    return False
-
-  return True
+  return classify(path).kind == 'component'
 
 def is_feature_component(path):
-  return is_feature_element(path) and is_component(path)
+  c = classify(path)
+  return c.kind == 'component' and c.feature is not None
 
 def is_page(path):
-  if not is_rekit_project(path):
-    return False
-  filename = os.path.basename(path)
-
-  if re.search(r'^([A-Z]+[a-z0-9]+)+\.', filename) is None:
-    return False
-
-  if re.search(r'\.js$|\.less$|\.scss$|\.css$', filename) is None:
-    return False
-
-  path = re.sub(r'\.less$|\.scss$|\.css$', '.js', path)
-  if not os.path.exists(path):
-    return False
-
-  text = codecs.open(path, 'r', 'utf8').read()
-  if re.search('class ' + get_filename_without_ext(filename) + ' extends', text, re.MULTILINE) is None:
-    return False
-
-  if re.search('export default connect\(', text, re.MULTILINE) is None:
-    return False
-
-  return True
+  return classify(path).kind == 'page'
 
 def is_redux_folder(path):
-  return is_rekit_project(path) and re.search(r'src/features/[^/]+/redux/?$', path, re.I) is not None
+  return classify(path).kind == 'redux'
 
 def is_reducer(path):
-  return os.path.basename(path) == 'reducer.js' \
-    and is_rekit_project(path) \
-    and is_redux_folder(os.path.dirname(path))
+  return classify(path).kind == 'reducer'
 
 def is_action(path):
-  if re.search(r'src\/features\/[^\/]+\/redux', path) is None:
-    return False
-
-  actionsPath = os.path.join(os.path.dirname(path), 'actions.js')
-  if not os.path.exists(actionsPath):
-    return False
-
-  text = codecs.open(actionsPath, 'r', 'utf8').read()
-  if text.find("'./" + get_filename_without_ext(path) + "';") == -1:
-    return False
-
-  return True
+  return classify(path).kind in ('action', 'async_action')
 
 def is_async_action(path):
-  if re.search(r'src\/features\/[^\/]+\/redux', path) is None:
-    return False
-
-  actionsPath = os.path.join(os.path.dirname(path), 'actions.js')
-  if not os.path.exists(actionsPath):
-    return False
-
-  actionName = get_filename_without_ext(path)
-  text = codecs.open(path, 'r', 'utf8').read()
-  # TODO: check constants to make it more precise
-  return re.search('function ' + actionName + r'\(', text, re.I) is not None \
-    and re.search('function dismiss' + actionName + r'Error\(', text, re.I) is not None
+  return classify(path).kind == 'async_action'
 
 def is_test(path):
-  if not is_rekit_project(path):
-    return False
-  return bool(re.search(r'\/test\/.*\.test\.js$', path))
+  return classify(path).kind == 'test'
 
 def is_test_folder(path):
-  if not is_rekit_project(path):
-    return False
-  return bool(re.search(r'\/test\/?$', path)) and os.path.isdir(path)
+  return classify(path).kind == 'test_folder'
 
 def is_app_test_folder(path):
-  if not is_rekit_project(path):
-    return False
-  return bool(re.search(r'\/test/app\/?$', path)) and os.path.isdir(path)
+  return classify(path).kind == 'app_test_folder'
 
 def is_cli_test_folder(path):
-  if not is_rekit_project(path):
-    return False
-  return bool(re.search(r'\/test/cli\/?$', path)) and os.path.isdir(path)
+  return classify(path).kind == 'cli_test_folder'
 
 def is_sub_test_folder(path):
-  if not is_rekit_project(path):
-    return False
-  return bool(re.search(r'\/test\/\w+', path)) and os.path.isdir(path)
+  return classify(path).kind in ('app_test_folder', 'cli_test_folder', 'sub_test_folder')
+
+# In-memory model of a Rekit project: every page, component, action, reducer and test file,
+# built in a background thread and kept up to date on save.
+Element = collections.namedtuple('Element', ['kind', 'feature', 'name', 'path'])
+
+# The index is kept between sessions in the cache dir, so a restart only stats the files
+# and re-reads the ones changed since.
+INDEX_SNAPSHOT = 'index.json'
+INDEX_SNAPSHOT_VERSION = 1
+INDEX_SAVE_DELAY = 5000
+
+class ProjectIndex(object):
+  def __init__(self, root):
+    self.root = root
+    self.elements = {}
+    self.ready = False
+    self.building = False
+    self.pending = False
+    self.lock = threading.Lock()
+    self.items = None
+    # path: ((mtime, size), Element or None), None until the first build
+    self.files = None
+    self.saveScheduled = False
+
+  def refresh(self):
+    with self.lock:
+      if self.building:
+        self.pending = True
+        return
+      self.building = True
+    threading.Thread(target=self.build).start()
+
+  def build(self):
+    changed = False
+    while True:
+      with self.lock:
+        previous = self.files
+      if previous is None:
+        previous = self.load_snapshot()
+      files, stale = self.sweep(previous)
+      changed = changed or stale
+      elements = dict((path, f[1]) for path, f in files.items() if f[1] is not None)
+      with self.lock:
+        self.files = files
+        self.elements = elements
+        self.ready = True
+        self.items = None
+        if not self.pending:
+          self.building = False
+          break
+        self.pending = False
+    invalidate_classify_cache()
+    if changed:
+      self.save_snapshot()
+
+  def sweep(self, previous):
+    # Stats every indexed file and reads only those changed since `previous`.
+    # Returns the new files and whether anything changed.
+    stamps = {}
+    for path in self.scan():
+      try:
+        st = os.stat(path)
+      except OSError:
+        continue
+      stamps[path] = (st.st_mtime, st.st_size)
+    stale = set(p for p, stamp in stamps.items() if p not in previous or previous[p][0] != stamp)
+    removed = [p for p in previous if p not in stamps]
+    # which redux files are actions depends on actions.js, re-read the whole folder
+    reduxFolders = set(os.path.dirname(p) for p in stale.union(removed) if os.path.basename(os.path.dirname(p)) == 'redux')
+    files = {}
+    for path, stamp in stamps.items():
+      if path in stale or os.path.dirname(path) in reduxFolders:
+        files[path] = (stamp, read_element(path))
+      else:
+        files[path] = previous[path]
+    return files, bool(stale or removed)
+
+  def load_snapshot(self):
+    data = load_cache_json(self.root, INDEX_SNAPSHOT, None)
+    if not isinstance(data, dict) or data.get('version') != INDEX_SNAPSHOT_VERSION or data.get('root') != self.root:
+      return {}
+    files = {}
+    try:
+      for relPath, (mtime, size, element, facts) in data['files'].items():
+        path = self.root + '/' + relPath
+        files[path] = ((mtime, size), Element(element[0], element[1], element[2], path) if element else None)
+        if facts:
+          put_file_facts((path, mtime, size), matchers.FileFacts(frozenset(facts[0]), facts[1], tuple(facts[2]), frozenset(facts[3])))
+    except (KeyError, TypeError, ValueError, IndexError):
+      return {}
+    return files
+
+  def save_snapshot(self):
+    with self.lock:
+      files = dict(self.files or {})
+    data = {}
+    for path, (stamp, element) in files.items():
+      # file facts are kept for the files still in the cache
+      facts = peek_file_facts((path,) + stamp)
+      data[path[len(self.root) + 1:]] = [stamp[0], stamp[1],
+        [element.kind, element.feature, element.name] if element is not None else None,
+        [sorted(facts.classes), facts.connected, list(facts.functions), sorted(facts.imports)] if facts is not None else None]
+    save_cache_json(self.root, INDEX_SNAPSHOT, {'version': INDEX_SNAPSHOT_VERSION, 'root': self.root, 'files': data})
+
+  def save_later(self):
+    with self.lock:
+      if self.saveScheduled:
+        return
+      self.saveScheduled = True
+    sublime.set_timeout(self.on_save_timeout, INDEX_SAVE_DELAY)
+
+  def on_save_timeout(self):
+    with self.lock:
+      self.saveScheduled = False
+    threading.Thread(target=self.save_snapshot).start()
+
+  def scan(self):
+    featuresPath = os.path.join(self.root, 'src/features').replace('\\', '/')
+    folders = [os.path.join(self.root, 'src/components').replace('\\', '/')]
+    for feature in list_dir(featuresPath):
+      featurePath = featuresPath + '/' + feature
+      folders.extend([featurePath, featurePath + '/redux'])
+    for folder in folders:
+      for filename in list_dir(folder):
+        if filename.endswith('.js'):
+          yield folder + '/' + filename
+    testPath = os.path.join(self.root, 'test/app')
+    for dirpath, dirnames, filenames in os.walk(testPath):
+      for filename in filenames:
+        if filename.endswith('.test.js'):
+          yield os.path.join(dirpath, filename).replace('\\', '/')
+
+  def is_indexed(self, path):
+    return path.startswith(self.root + '/') and matchers.INDEXED_PATH_RE.search(path[len(self.root):]) is not None
+
+  def update(self, path):
+    if not self.is_indexed(path):
+      return
+    paths = [path]
+    if os.path.basename(path) == 'actions.js':
+      # re-exports decide which redux files are actions
+      folder = os.path.dirname(path)
+      paths = [folder + '/' + f for f in list_dir(folder) if f.endswith('.js')]
+    for p in paths:
+      try:
+        st = os.stat(p)
+      except OSError:
+        st = None
+      element = read_element(p) if st is not None else None
+      with self.lock:
+        if element is None:
+          self.elements.pop(p, None)
+        else:
+          self.elements[p] = element
+        if self.files is not None:
+          if st is None:
+            self.files.pop(p, None)
+          else:
+            self.files[p] = ((st.st_mtime, st.st_size), element)
+        self.items = None
+    invalidate_classify_cache()
+    self.save_later()
+
+  def get_kind(self, path):
+    # None means the index can't tell and the caller should look at the disk,
+    # e.g. for files added by git or a terminal since the last sweep
+    if not self.ready or not self.is_indexed(path) or path not in self.files:
+      return None
+    element = self.elements.get(path)
+    return element.kind if element is not None else 'other'
+
+  def has_file(self, path):
+    path = path.replace('\\', '/')
+    if self.ready and self.is_indexed(path) and path in self.elements:
+      return True
+    return os.path.exists(path)
+
+  def forget(self, path):
+    # a file found missing outside of a save or a sweep
+    with self.lock:
+      if self.files is None or self.files.pop(path, None) is None:
+        return
+      self.elements.pop(path, None)
+      self.items = None
+    self.save_later()
+
+  def get_feature(self, feature):
+    result = collections.defaultdict(list)
+    for element in list(self.elements.values()):
+      if element.feature == feature:
+        result[element.kind].append(element)
+    return result
+
+  def get_quick_panel_items(self):
+    with self.lock:
+      if self.items is None:
+        elements = sorted(self.elements.values(), key=lambda e: (e.feature or '', e.name, e.kind))
+        labels = [[e.feature + '/' + e.name if e.feature else e.name, e.kind] for e in elements]
+        self.items = (elements, labels)
+      return self.items
+
+def list_dir(path):
+  try:
+    return sorted(os.listdir(path))
+  except OSError:
+    return []
+
+def read_element(path):
+  name = get_filename_without_ext(path)
+  if matchers.TEST_FILE_RE.search(path) is not None:
+    m = matchers.TEST_FEATURE_RE.search(path)
+    return Element('test', m.group(1) if m else None, name, path)
+  feature = get_feature_name(path) if 'src/features/' in path else None
+  kind = classify_element(path, name, feature)
+  if kind == 'other':
+    return None
+  return Element(kind, feature, name, path)
+
+_indexes = {}
+
+def get_project_index(root):
+  index = _indexes.get(root)
+  if index is None:
+    index = _indexes[root] = ProjectIndex(root)
+    index.refresh()
+  return index
+
+def refresh_project_index(root):
+  for indexes in (_indexes, _usage_indexes):
+    index = indexes.get(root)
+    if index is not None:
+      index.refresh()
+
+# Where identifiers are used under src/ and test/, built in the background per Rekit root
+# and saved next to the project index.
+USAGES_SNAPSHOT = 'usages.json'
+_usage_indexes = {}
+
+def get_usage_index(root):
+  index = _usage_indexes.get(root)
+  if index is None:
+    from .rekit import usages
+    index = _usage_indexes[root] = usages.UsageIndex(root, os.path.join(get_cache_dir(root), USAGES_SNAPSHOT))
+    index.refresh()
+  return index
+
+# Files Rekit scripts update themselves when an element is removed.
+REKIT_MANAGED_FILES = ('index.js', 'route.js', 'style.less', 'redux/actions.js', 'redux/reducer.js',
+  'redux/constants.js', 'redux/initialState.js')
+
+def get_element_files(c, path):
+  # the element's own files, its test and the files Rekit updates along with them
+  if c.feature is not None:
+    folder = os.path.join(c.root, 'src/features', c.feature)
+  else:
+    folder = os.path.join(c.root, 'src/components')
+  files = set(os.path.join(folder, name).replace('\\', '/') for name in REKIT_MANAGED_FILES)
+  files.add(matchers.to_js_path(path))
+  if c.test_target is not None:
+    files.add(c.test_target.replace('\\', '/'))
+  return files
+
+def get_removal_impact(paths, maxLines=8):
+  """Lines telling where elements about to be removed are still used, for the confirm dialog."""
+  paths = get_paths(paths)
+  lines = []
+  for path in paths:
+    c = classify(path)
+    index = _usage_indexes.get(c.root)
+    if index is None or not index.ready.is_set():
+      continue
+    exclude = get_element_files(c, path).union(paths)
+    usages = index.find(c.name, exclude)
+    if not usages:
+      continue
+    lines.append('')
+    lines.append('%s is still used in:' % c.name)
+    for u in usages[:maxLines]:
+      lines.append('  %s:%d' % (os.path.relpath(u.path, c.root), u.line))
+    if len(usages) > maxLines:
+      lines.append('  ... and %d more' % (len(usages) - maxLines))
+  return lines
+
+def confirm_removal(message, paths):
+  return sublime.ok_cancel_dialog('\n'.join([message] + get_removal_impact(paths)), 'Remove')
+
+def get_window_roots(window):
+  roots = []
+  for folder in window.folders():
+    root = get_rekit_root(folder.replace('\\', '/'))
+    if root is not None and root not in roots:
+      roots.append(root)
+  return roots
 
 def is_other():
   return True
@@ -262,201 +1098,221 @@ def is_other():
 def get_path(paths):
   return paths[0].replace('\\', '/')
 
+def get_paths(paths):
+  return [p.replace('\\', '/') for p in paths]
+
+def all_paths(paths, predicate):
+  return len(paths) > 0 and all(predicate(p) for p in get_paths(paths))
+
+PREVIEW_HEADER = '''Files the Rekit scripts are expected to create or change.
+Rendered from tools/cli/templates; changes to existing files are approximate.
+'''
+
+def scaffold(window, path, kind, feature, names, scripts):
+  # With preview_scaffolding on, the templates are rendered in a scratch view first and
+  # node only runs once that is confirmed.
+  if not names:
+    return
+  if not get_setting('preview_scaffolding', False):
+    run_scripts(path, scripts)
+    return
+  from .rekit import templates
+  rekitRoot = get_rekit_root(path)
+  text = templates.format_changes(rekitRoot, templates.plan(rekitRoot, kind, feature, names))
+  view = window.new_file()
+  view.set_scratch(True)
+  view.set_name('Rekit Preview: %s' % ', '.join(names))
+  view.assign_syntax('Packages/Diff/Diff.sublime-syntax')
+  view.run_command('rekit_output', { 'text': PREVIEW_HEADER + '\n' + text })
+  # let the view draw before the dialog blocks
+  sublime.set_timeout(functools.partial(confirm_scaffold, window, view, path, kind, names, scripts), 50)
+
+def confirm_scaffold(window, view, path, kind, names, scripts):
+  label = kind.replace('_', ' ').title()
+  if sublime.ok_cancel_dialog('Add %s: %s?' % (label, ', '.join(names)), 'Add'):
+    window.focus_view(view)
+    window.run_command('close_file')
+    run_scripts(path, scripts)
+
 class RekitAddFeatureCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    Window().show_input_panel("Feature name:", '', functools.partial(self.on_done, paths, False), None, None)
+    Window().show_input_panel("Feature name(s):", '', functools.partial(self.on_done, paths, False), None, None)
 
-  def on_done(self, paths, relative_to_project, name):
-    run_script(get_path(paths), 'add_feature', [name])
+  def on_done(self, paths, relative_to_project, text):
+    run_scripts(get_path(paths), [('add_feature', [name]) for name in parse_names(text)])
 
+  @profile.timed()
   def is_visible(self, paths = []):
     return is_features_folder(get_path(paths))
 
 class RekitRemoveFeatureCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    feature_name = get_feature_name(get_path(paths))
-    if sublime.ok_cancel_dialog('Remove Feature: %s?' % feature_name, 'Remove'):
-      run_script(get_path(paths), 'rm_feature', [feature_name])
+    feature_names = [get_feature_name(p) for p in get_paths(paths)]
+    if sublime.ok_cancel_dialog('Remove Feature: %s?' % ', '.join(feature_names), 'Remove'):
+      run_scripts(get_path(paths), [('rm_feature', [name]) for name in feature_names])
 
+  @profile.timed()
   def is_visible(self, paths = []):
-    return is_feature(get_path(paths))
+    return all_paths(paths, is_feature)
 
 class RekitAddComponentCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    Window().show_input_panel("Component name:", '', functools.partial(self.on_done, paths, False), None, None)
+    Window().show_input_panel("Component name(s):", '', functools.partial(self.on_done, paths, False), None, None)
 
-  def on_done(self, paths, relative_to_project, name):
-    args = [name]
+  def on_done(self, paths, relative_to_project, text):
     p = get_path(paths)
-    if is_feature(p):
-      featureName = get_feature_name(p)
-      args = [featureName + '/' + name]
-    run_script(p, 'add_component', args)
+    feature = get_feature_name(p) if is_feature(p) else None
+    prefix = feature + '/' if feature else ''
+    names = parse_names(text)
+    scaffold(self.window, p, 'component', feature, names, [('add_component', [prefix + name]) for name in names])
 
+  @profile.timed()
   def is_visible(self, paths = []):
-    p = get_path(paths)
-    return is_feature(p) or is_components_folder(p)
+    return classify(get_path(paths)).kind in ('feature', 'components')
 
 class RekitRemoveComponentCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    p = get_path(paths)
-    feature_name = None
-    component_name = get_filename_without_ext(get_path(paths))
-    args = component_name
-    if is_feature_component(p):
-      feature_name = get_feature_name(p)
-      args = '%s/%s' % (feature_name, component_name)
-
-    if sublime.ok_cancel_dialog('Remove Component: %s?' % args, 'Remove'):
+    names = []
+    for p in get_paths(paths):
+      component_name = get_filename_without_ext(p)
+      if is_feature_component(p):
+        component_name = '%s/%s' % (get_feature_name(p), component_name)
+      names.append(component_name)
+
+    if confirm_removal('Remove Component: %s?' % ', '.join(names), paths):
       Window().run_command('close')
-      run_script(get_path(paths), 'rm_component', [args])
+      run_scripts(get_path(paths), [('rm_component', [name]) for name in names])
+
+  @profile.timed()
   def is_visible(self, paths = []):
-    return is_component(get_path(paths))
+    return all_paths(paths, is_component)
 
 class RekitAddPageCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    Window().show_input_panel("Page name:", '', functools.partial(self.on_done, paths, False), None, None)
+    Window().show_input_panel("Page name(s):", '', functools.partial(self.on_done, paths, False), None, None)
 
-  def on_done(self, paths, relative_to_project, name):
+  def on_done(self, paths, relative_to_project, text):
     p = get_path(paths)
     featureName = get_feature_name(p)
-    run_script(get_path(paths), 'add_page', (featureName + '/' + name).split(' '))
+    names = parse_names(text)
+    scaffold(self.window, p, 'page', featureName, [name.split(' ')[0] for name in names],
+      [('add_page', (featureName + '/' + name).split(' ')) for name in names])
 
+  @profile.timed()
   def is_visible(self, paths = []):
     return is_feature(get_path(paths))
 
 class RekitRemovePageCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    feature_name = get_feature_name(get_path(paths))
-    page_name = get_filename_without_ext(get_path(paths))
-    if sublime.ok_cancel_dialog('Remove Page: %s/%s?' % (feature_name, page_name), 'Remove'):
+    names = ['%s/%s' % (get_feature_name(p), get_filename_without_ext(p)) for p in get_paths(paths)]
+    if confirm_removal('Remove Page: %s?' % ', '.join(names), paths):
       Window().run_command('close')
-      run_script(get_path(paths), 'rm_page', ['%s/%s' % (feature_name, page_name)])
+      run_scripts(get_path(paths), [('rm_page', [name]) for name in names])
+
+  @profile.timed()
   def is_visible(self, paths = []):
-    return is_page(get_path(paths))
+    return all_paths(paths, is_page)
 
 class RekitAddActionCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    Window().show_input_panel("Action name:", '', functools.partial(self.on_done, paths, False), None, None)
+    Window().show_input_panel("Action name(s):", '', functools.partial(self.on_done, paths, False), None, None)
 
-  def on_done(self, paths, relative_to_project, name):
+  def on_done(self, paths, relative_to_project, text):
     p = get_path(paths)
     featureName = get_feature_name(p)
-    run_script(get_path(paths), 'add_action', (featureName + '/' + name).split(' '))
+    names = parse_names(text)
+    scaffold(self.window, p, 'action', featureName, [name.split(' ')[0] for name in names],
+      [('add_action', (featureName + '/' + name).split(' ')) for name in names])
 
+  @profile.timed()
   def is_visible(self, paths = []):
     return is_redux_folder(get_path(paths))
 
 class RekitRemoveActionCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    p = get_path(paths)
-    featureName = get_feature_name(p)
-    actionName = get_filename_without_ext(p)
-    if sublime.ok_cancel_dialog('Remove Action: %s/%s?' % (featureName, actionName), 'Remove'):
+    names = ['%s/%s' % (get_feature_name(p), get_filename_without_ext(p)) for p in get_paths(paths)]
+    if confirm_removal('Remove Action: %s?' % ', '.join(names), paths):
       Window().run_command('close')
-      run_script(p, 'rm_action', ['%s/%s' % (featureName, actionName)])
-
-  def on_done(self, paths, relative_to_project, name):
-    if sublime.ok_cancel_dialog('Remove Action: %s?' % name, 'Remove'):
-      run_script(get_path(paths), 'rm_action', name.split(' '))
+      run_scripts(get_path(paths), [('rm_action', [name]) for name in names])
 
+  @profile.timed()
   def is_visible(self, paths = []):
-    p = get_path(paths);
-    return is_action(p) and not is_async_action(p)
+    return all_paths(paths, lambda p: classify(p).kind == 'action')
 
 class RekitAddAsyncActionCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    Window().show_input_panel("Async action name:", '', functools.partial(self.on_done, paths, False), None, None)
+    Window().show_input_panel("Async action name(s):", '', functools.partial(self.on_done, paths, False), None, None)
 
-  def on_done(self, paths, relative_to_project, name):
+  def on_done(self, paths, relative_to_project, text):
     p = get_path(paths)
     featureName = get_feature_name(p)
-    run_script(get_path(paths), 'add_async_action', (featureName + '/' + name).split(' '))
+    names = parse_names(text)
+    scaffold(self.window, p, 'async_action', featureName, [name.split(' ')[0] for name in names],
+      [('add_async_action', (featureName + '/' + name).split(' ')) for name in names])
 
+  @profile.timed()
   def is_visible(self, paths = []):
     return is_redux_folder(get_path(paths))
 
 class RekitRemoveAsyncActionCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    p = get_path(paths)
-    featureName = get_feature_name(p)
-    actionName = get_filename_without_ext(p)
-    if sublime.ok_cancel_dialog('Remove Async Action: %s/%s?' % (featureName, actionName), 'Remove'):
+    names = ['%s/%s' % (get_feature_name(p), get_filename_without_ext(p)) for p in get_paths(paths)]
+    if confirm_removal('Remove Async Action: %s?' % ', '.join(names), paths):
       Window().run_command('close')
-      run_script(p, 'rm_async_action', ['%s/%s' % (featureName, actionName)])
+      run_scripts(get_path(paths), [('rm_async_action', [name]) for name in names])
 
+  @profile.timed()
   def is_visible(self, paths = []):
-    return is_async_action(get_path(paths))
+    return all_paths(paths, is_async_action)
+
+TEST_SCRIPTS = {
+  'reducer': 'add_reducer_test',
+  'action': 'add_action_test',
+  'async_action': 'add_async_action_test',
+  'page': 'add_page_test',
+  'component': 'add_component_test',
+}
 
 class RekitUnitTestCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
     p = get_path(paths)
-    rekitRoot = get_rekit_root(p)
-    targetName = get_filename_without_ext(p)
-    featureName = None
-    if is_reducer(p):
-      featureName = get_feature_name(p)
-      testPath = os.path.join(rekitRoot, 'test/app/features/%s/redux/reducer.test.js' % featureName)
-      if not os.path.exists(testPath):
-        if sublime.ok_cancel_dialog('The test file doesn\'t exist, create it? '):
-          script = 'add_reducer_test'
-          run_script(p, script, [featureName], on_done=functools.partial(self.on_test_created, testPath))
-      else:
-        Window().open_file(testPath)
-    if is_action(p):
-      featureName = get_feature_name(p)
-      testPath = os.path.join(rekitRoot, 'test/app/features/%s/redux/%s.test.js' % (featureName, targetName))
-      if not os.path.exists(testPath):
-        if sublime.ok_cancel_dialog('The test file doesn\'t exist, create it? '):
-          script = 'add_action_test'
-          if is_async_action(p):
-            script = 'add_async_action_test';
-          run_script(p, script, [featureName + '/' + targetName], on_done=functools.partial(self.on_test_created, testPath))
-      else:
-        Window().open_file(testPath)
-
+    c = classify(p)
+    if c.kind not in TEST_SCRIPTS:
       return
-    elif is_page(p):
-      featureName = get_feature_name(p)
-      testPath = os.path.join(rekitRoot, 'test/app/features/%s/%s.test.js' % (featureName, targetName))
-      if not os.path.exists(testPath):
-        if sublime.ok_cancel_dialog('The test file doesn\'t exist, create it? '):
-          script = 'add_page_test'
-          run_script(p, script, [featureName + '/' + targetName], on_done=functools.partial(self.on_test_created, testPath))
-      else:
-        Window().open_file(testPath)
-
-    elif is_feature_component(p):
-      featureName = get_feature_name(p)
-      testPath = os.path.join(rekitRoot, 'test/app/features/%s/%s.test.js' % (featureName, targetName))
-      if not os.path.exists(testPath):
-        if sublime.ok_cancel_dialog('The test file doesn\'t exist, create it? '):
-          script = 'add_component_test'
-          run_script(p, script, [featureName + '/' + targetName], on_done=functools.partial(self.on_test_created, testPath))
-      else:
-        Window().open_file(testPath)
-    elif is_component(p):
-      testPath = os.path.join(rekitRoot, 'test/app/components/%s.test.js' % targetName)
-      if not os.path.exists(testPath):
-        if sublime.ok_cancel_dialog('The test file doesn\'t exist, create it? '):
-          script = 'add_component_test'
-          run_script(p, script, [targetName], on_done=functools.partial(self.on_test_created, testPath))
+    testPath = c.test_target
+    if get_project_index(c.root).has_file(testPath):
+      Window().open_file(testPath)
+    elif sublime.ok_cancel_dialog('The test file doesn\'t exist, create it? '):
+      if c.kind == 'reducer':
+        args = [c.feature]
+      elif c.feature is None:
+        args = [c.name]
       else:
-        Window().open_file(testPath)
+        args = [c.feature + '/' + c.name]
+      run_script(p, TEST_SCRIPTS[c.kind], args, on_done=functools.partial(self.on_test_created, testPath))
 
   def on_test_created(self, testPath):
     Window().open_file(testPath)
 
+  @profile.timed()
   def is_visible(self, paths = []):
-    p = get_path(paths)
-    return is_action(p) or is_page(p) or is_component(p) or is_reducer(p)
+    return classify(get_path(paths)).kind in TEST_SCRIPTS
+
 
+_output_panels = {}
 
 def get_test_output_panel():
-  panel = Window().find_output_panel('rekit_output_panel')
-  if panel is None:
-    panel = Window().create_output_panel('rekit_output_panel')
-    panel.set_read_only(True)
+  # called on the main thread only; panels are looked up once per window
+  window = Window()
+  panel = _output_panels.get(window.id())
+  if panel is None or not panel.is_valid():
+    panel = window.find_output_panel('rekit_output_panel')
+    if panel is None:
+      panel = window.create_output_panel('rekit_output_panel')
+      panel.set_read_only(True)
+      # makes test failures and stack traces clickable
+      panel.settings().set('result_file_regex', r'([^\s()]+\.js):(\d+):?(\d+)?')
+    _output_panels[window.id()] = panel
   return panel
 
 class RekitOutputCommand(sublime_plugin.TextCommand):
@@ -466,34 +1322,305 @@ class RekitOutputCommand(sublime_plugin.TextCommand):
       self.view.erase(edit, sublime.Region(0, self.view.size()))
     else:
       self.view.insert(edit, self.view.size(), args.get('text') + '\n')
+      maxLines = args.get('max_lines')
+      if maxLines:
+        excess = self.view.rowcol(self.view.size())[0] - maxLines
+        if excess > 0:
+          self.view.erase(edit, sublime.Region(0, self.view.text_point(excess, 0)))
     self.view.set_read_only(True)
 
+class OutputBuffer(object):
+  """Collects output lines from any thread and writes them to the panel from the main thread.
+
+  Lines are flushed in one edit every FLUSH_INTERVAL ms, or sooner once FLUSH_LINES are waiting.
+  If producers outrun the flushes, the oldest buffered lines are dropped.
+  """
+  FLUSH_INTERVAL = 50
+  FLUSH_LINES = 500
+  BUFFER_LINES = 5000
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.lines = collections.deque(maxlen=self.BUFFER_LINES)
+    self.received = 0
+    self.clear = False
+    self.scheduled = False
+    self.urgent = False
+
+  def write(self, text):
+    delay = None
+    with self.lock:
+      self.lines.append(text)
+      self.received += 1
+      if not self.scheduled:
+        self.scheduled = True
+        delay = self.FLUSH_INTERVAL
+      elif not self.urgent and len(self.lines) >= self.FLUSH_LINES:
+        self.urgent = True
+        delay = 0
+    if delay is not None:
+      sublime.set_timeout(self.flush, delay)
+
+  def reset(self):
+    with self.lock:
+      self.lines.clear()
+      self.received = 0
+      self.clear = True
+      scheduled = self.scheduled
+      self.scheduled = True
+    if not scheduled:
+      sublime.set_timeout(self.flush, 0)
+
+  @profile.timed()
+  def flush(self):
+    with self.lock:
+      lines = list(self.lines)
+      dropped = self.received - len(lines)
+      clear = self.clear
+      self.lines.clear()
+      self.received = 0
+      self.clear = False
+      self.scheduled = False
+      self.urgent = False
+    if not lines and not clear:
+      return
+
+    panel = get_test_output_panel()
+    if clear:
+      panel.run_command('rekit_output', { 'clear': True })
+    if dropped > 0:
+      lines.insert(0, '... %d lines skipped' % dropped)
+    if lines:
+      maxLines = get_setting('output_panel_max_lines', 10000)
+      panel.run_command('rekit_output', { 'text': '\n'.join(lines), 'max_lines': maxLines })
+    show_rekit_output_panel()
+
+output_buffer = OutputBuffer()
+
+@profile.timed()
 def show_rekit_output(text):
-  panel = get_test_output_panel()
-  Window().run_command('show_panel', { 'panel': 'output.rekit_output_panel' })
-  panel.run_command('rekit_output', {'text': text})
+  output_buffer.write(text)
+
+def set_output_base_dir(path):
+  get_test_output_panel().settings().set('result_base_dir', path)
 
 def show_rekit_output_panel():
-  panel = get_test_output_panel()
-  Window().run_command('show_panel', { 'panel': 'output.rekit_output_panel' })
+  window = Window()
+  if window.active_panel() != 'output.rekit_output_panel':
+    get_test_output_panel()
+    window.run_command('show_panel', { 'panel': 'output.rekit_output_panel' })
 
 def clear_rekit_output():
-  panel = get_test_output_panel()
-  Window().run_command('show_panel', { 'panel': 'output.rekit_output_panel' })
-  panel.run_command('rekit_output', { 'clear': True })
+  output_buffer.reset()
+  main_thread(show_rekit_output_panel)
+
+class TestRun(object):
+  """One click on a test command: one or more run_test.js processes and their merged results."""
+  def __init__(self, rekitRoot, targets):
+    self.rekitRoot = rekitRoot
+    self.targets = targets
+    self.parsers = {}
+    self.jobs = {}
+    self.remaining = len(targets)
+    self.lock = threading.Lock()
+    self.started = time.time()
+    self.finished = None
+    self.sharded = False
+
+  def start(self, serial=True):
+    main_thread(set_output_base_dir, self.rekitRoot)
+    for target in self.targets:
+      self.run_target(target, serial=('test', self.rekitRoot) if serial else None)
+
+  def start_sharded(self, shards):
+    # every shard runs its targets one by one, shards run side by side
+    self.sharded = True
+    main_thread(set_output_base_dir, self.rekitRoot)
+    show_rekit_output('Running %d test targets in %d shards...' % (len(self.targets), len(shards)))
+    for i, shard in enumerate(shards):
+      for target in shard:
+        self.run_target(target, serial=('test', self.rekitRoot, i), limit=len(shards), echo=False)
+
+  def run_target(self, target, **kwargs):
+    from .rekit import testoutput
+    parser = self.parsers[target] = testoutput.TestOutputParser(self.rekitRoot, target)
+    self.jobs[target] = run_command(['node', './tools/run_test.js', target], cwd=self.rekitRoot,
+      on_line=parser.feed, on_exit=functools.partial(self.on_exit, target), **kwargs)
+
+  def on_exit(self, target, code):
+    if self.sharded:
+      results = self.parsers[target].results
+      show_rekit_output('%s: %d passed, %d failed%s' % (target, len([r for r in results if r.status == 'passed']),
+        len([r for r in results if r.status == 'failed']), '' if code == 0 else ' (exit code %s)' % code))
+    with self.lock:
+      self.remaining -= 1
+      if self.remaining > 0:
+        return
+    self.finished = time.time()
+    _report_exists.clear()
+    self.save_durations()
+    self.save_history()
+    self.show_summary()
+
+  def cancel(self):
+    for job in list(self.jobs.values()):
+      if job.finished is None:
+        scheduler.cancel_job(job)
+
+  def save_durations(self):
+    durations = load_test_durations(self.rekitRoot)
+    for target, job in self.jobs.items():
+      if job.finished is not None and not job.cancelled:
+        durations[target] = round(job.wall_time(), 3)
+    save_cache_json(self.rekitRoot, 'test_durations.json', durations)
+
+  def save_history(self):
+    # the fingerprint tells test changes from flakiness, it is taken on the writer thread
+    from .rekit import history
+    results = [r for target, job in self.jobs.items() if job.finished is not None and not job.cancelled
+      for r in self.parsers[target].results]
+    if not results:
+      return
+    rekitRoot = self.rekitRoot
+    date = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started))
+    tests = [[r.title, r.status, r.duration] for r in results]
+    history.record(os.path.join(get_cache_dir(rekitRoot), TEST_HISTORY), lambda: {
+      'date': date,
+      'fingerprint': get_build_fingerprint(rekitRoot, ('src', 'test')),
+      'tests': tests,
+    }, get_setting('test_history_size', 200))
+
+  def get_results(self):
+    return [r for target in self.targets if target in self.parsers for r in self.parsers[target].results]
+
+  def get_failed_files(self):
+    files = []
+    for r in self.get_results():
+      if r.status == 'failed' and r.file and r.file not in files:
+        files.append(r.file)
+    return files
+
+  def show_summary(self):
+    from .rekit import testoutput
+    results = self.get_results()
+    failed = [r for r in results if r.status == 'failed']
+    slow = [r for r in results if r.duration is not None and r.duration >= testoutput.SLOW_TEST_MS]
+    show_rekit_output('')
+    show_rekit_output('Rekit: %d passed, %d failed, %d slow (%.1fs)' % (
+      len([r for r in results if r.status == 'passed']), len(failed), len(slow), self.finished - self.started))
+    for r in failed:
+      if r.file:
+        show_rekit_output('%s:%s: %s' % (r.file, r.line or 1, r.title))
+      else:
+        show_rekit_output('  %s' % r.title)
+    for r in sorted(slow, key=lambda r: -r.duration)[:10]:
+      show_rekit_output('  slow: %s (%dms)' % (r.title, r.duration))
+
+def get_cache_dir(rekitRoot):
+  # per project data kept between sessions, outside of the project itself
+  import hashlib
+  return os.path.join(sublime.cache_path(), 'Rekit', hashlib.md5(rekitRoot.encode('utf8')).hexdigest())
+
+def load_cache_json(rekitRoot, name, default):
+  try:
+    with codecs.open(os.path.join(get_cache_dir(rekitRoot), name), 'r', 'utf8') as f:
+      return json.load(f)
+  except (IOError, ValueError):
+    return default
+
+def save_cache_json(rekitRoot, name, data):
+  folder = get_cache_dir(rekitRoot)
+  try:
+    if not os.path.isdir(folder):
+      os.makedirs(folder)
+    tmpPath = os.path.join(folder, name + '.tmp')
+    with codecs.open(tmpPath, 'w', 'utf8') as f:
+      json.dump(data, f)
+    os.replace(tmpPath, os.path.join(folder, name))
+  except OSError:
+    pass
+
+TEST_HISTORY = 'test_history.jsonl'
+
+def load_test_durations(rekitRoot):
+  return load_cache_json(rekitRoot, 'test_durations.json', {})
+
+_test_runs = {}
+
+def get_test_target(rekitRoot, path):
+  return path.replace(os.path.join(rekitRoot, 'test/'), '')
+
+def run_tests(rekitRoot, targets, serial=True):
+  clear_rekit_output()
+  show_rekit_output_panel()
+  run = TestRun(rekitRoot, targets)
+  _test_runs[rekitRoot] = run
+  run.start(serial)
+  return run
+
+def get_test_units(rekitRoot, folder):
+  # run_test.js targets small enough to balance across shards: one per feature,
+  # per other test folder and per loose test file
+  units = []
+  for name in list_dir(folder):
+    path = folder + '/' + name
+    if os.path.isdir(path):
+      if name == 'features':
+        units.extend(get_test_units(rekitRoot, path))
+      else:
+        units.append(get_test_target(rekitRoot, path))
+    elif name.endswith('.test.js'):
+      units.append(get_test_target(rekitRoot, path))
+  return units
+
+def plan_shards(units, durations, count):
+  # longest first onto the least loaded shard; unknown units count as an average one
+  known = [durations[u] for u in units if u in durations]
+  default = sum(known) / len(known) if known else 1.0
+  shards = [[] for i in range(min(count, len(units)))]
+  loads = [0.0] * len(shards)
+  for unit in sorted(units, key=lambda u: -durations.get(u, default)):
+    i = loads.index(min(loads))
+    shards[i].append(unit)
+    loads[i] += durations.get(unit, default)
+  return shards
+
+def get_shard_count():
+  count = get_setting('test_shards', 0)
+  if count > 0:
+    return count
+  import multiprocessing
+  return multiprocessing.cpu_count()
+
+def is_sharded():
+  return get_setting('sharded_tests', False) and get_shard_count() > 1
+
+def run_sharded_tests(rekitRoot, folders):
+  units = []
+  for folder in folders:
+    units.extend(get_test_units(rekitRoot, folder))
+  if not units:
+    return run_tests(rekitRoot, [get_test_target(rekitRoot, f) for f in folders])
+  clear_rekit_output()
+  show_rekit_output_panel()
+  run = TestRun(rekitRoot, units)
+  _test_runs[rekitRoot] = run
+  run.start_sharded(plan_shards(units, load_test_durations(rekitRoot), get_shard_count()))
+  return run
+
+def get_command_root(window, paths):
+  if paths:
+    return get_rekit_root(get_path(paths))
+  roots = get_window_roots(window)
+  return roots[0] if roots else None
 
 class RekitRunTestCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
     p = get_path(paths)
-    rekitRoot = get_rekit_root(paths[0])
-    clear_rekit_output()
-    show_rekit_output_panel()
-    run_command([
-      'node',
-      './tools/run_test.js',
-      p.replace(os.path.join(rekitRoot, 'test/'), '')
-    ], cwd=rekitRoot)
+    rekitRoot = get_rekit_root(p)
+    run_tests(rekitRoot, [get_test_target(rekitRoot, p)])
 
+  @profile.timed()
   def is_visible(self, paths = []):
     p = get_path(paths)
     return is_test(p)
@@ -501,78 +1628,454 @@ class RekitRunTestCommand(sublime_plugin.WindowCommand):
 class RekitRunTestsCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
     p = get_path(paths)
-    rekitRoot = get_rekit_root(paths[0])
-    clear_rekit_output()
-    show_rekit_output_panel()
-    run_command([
-      'node',
-      './tools/run_test.js',
-      p.replace(os.path.join(rekitRoot, 'test/'), '')
-    ], cwd=rekitRoot)
+    rekitRoot = get_rekit_root(p)
+    if is_sharded():
+      run_sharded_tests(rekitRoot, [p])
+    else:
+      run_tests(rekitRoot, [get_test_target(rekitRoot, p)])
 
+  @profile.timed()
   def is_visible(self, paths = []):
     p = get_path(paths)
     return is_sub_test_folder(p)
+
 class RekitRunAllTestsCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    rekitRoot = get_rekit_root(paths[0])
-    clear_rekit_output()
-    show_rekit_output_panel()
-    run_command([
-      'node',
-      './tools/run_test.js',
-      'all'
-    ], cwd=rekitRoot)
+    rekitRoot = get_rekit_root(get_path(paths))
+    if is_sharded():
+      run_sharded_tests(rekitRoot, [rekitRoot + '/test/app', rekitRoot + '/test/cli'])
+    else:
+      run_tests(rekitRoot, ['all'])
 
+  @profile.timed()
   def is_visible(self, paths = []):
     p = get_path(paths)
     return is_test_folder(p)
 
+class RekitRerunFailedTestsCommand(sublime_plugin.WindowCommand):
+  def run(self, paths = []):
+    rekitRoot = get_command_root(self.window, paths)
+    files = _test_runs[rekitRoot].get_failed_files()
+    run_tests(rekitRoot, [get_test_target(rekitRoot, f) for f in files])
+
+  def is_enabled(self, paths = []):
+    run = _test_runs.get(get_command_root(self.window, paths))
+    return run is not None and run.finished is not None and len(run.get_failed_files()) > 0
+
+  @profile.timed()
+  def is_visible(self, paths = []):
+    return not paths or classify(get_path(paths)).kind in ('test_folder', 'app_test_folder', 'cli_test_folder', 'sub_test_folder')
+
+_import_graphs = {}
+
+def get_import_graph(rekitRoot):
+  graph = _import_graphs.get(rekitRoot)
+  if graph is None:
+    from .rekit import importgraph
+    graph = _import_graphs[rekitRoot] = importgraph.ImportGraph(rekitRoot)
+  return graph
+
+def get_changed_files(rekitRoot, base):
+  # modified files relative to `base` plus untracked ones
+  output = subprocess.check_output(['git', 'diff', '--name-only', '--relative', base], cwd=rekitRoot, startupinfo=get_startupinfo())
+  output += subprocess.check_output(['git', 'ls-files', '--others', '--exclude-standard'], cwd=rekitRoot, startupinfo=get_startupinfo())
+  files = []
+  for name in output.decode('utf8').splitlines():
+    if name.strip():
+      files.append(os.path.join(rekitRoot, name.strip()).replace('\\', '/'))
+  return files
+
+def find_affected_tests(rekitRoot, base):
+  changed = get_changed_files(rekitRoot, base)
+  graph = get_import_graph(rekitRoot)
+  graph.update()
+  tests = set(graph.get_affected_tests(changed))
+  # conventional test location, in case the test doesn't import its target directly
+  for path in changed:
+    testPath = classify(path).test_target
+    if testPath is not None and os.path.exists(testPath):
+      tests.add(testPath.replace('\\', '/'))
+  return sorted(tests)
+
+class RekitRunAffectedTestsCommand(sublime_plugin.WindowCommand):
+  def run(self, paths = []):
+    rekitRoot = get_command_root(self.window, paths)
+    base = get_setting('affected_tests_base', 'HEAD')
+    threading.Thread(target=self.run_affected, args=(rekitRoot, base)).start()
+
+  def run_affected(self, rekitRoot, base):
+    try:
+      tests = find_affected_tests(rekitRoot, base)
+    except (OSError, subprocess.CalledProcessError) as e:
+      show_rekit_output('Finding affected tests failed:')
+      show_rekit_output(str(e))
+      return
+    if not tests:
+      show_rekit_output('No tests affected by changes since %s.' % base)
+      return
+    main_thread(run_tests, rekitRoot, [get_test_target(rekitRoot, t) for t in tests])
+
+  def is_enabled(self, paths = []):
+    return get_command_root(self.window, paths) is not None
+
+  @profile.timed()
+  def is_visible(self, paths = []):
+    return not paths or classify(get_path(paths)).kind in ('root', 'test_folder')
+
+# Watch mode: saving a file re-runs its test, once saves have settled for WATCH_DEBOUNCE ms.
+WATCH_DEBOUNCE = 300
+_watched_roots = set()
+_watch_saves = {}
+_watch_runs = {}
+
+def get_test_file(path):
+  c = classify(path)
+  if c.kind == 'test':
+    return path
+  if c.test_target is not None and get_project_index(c.root).has_file(c.test_target):
+    return c.test_target.replace('\\', '/')
+  return None
+
+def watch_saved(rekitRoot, path):
+  generation, paths = _watch_saves.get(rekitRoot, (0, []))
+  if path not in paths:
+    paths = paths + [path]
+  _watch_saves[rekitRoot] = (generation + 1, paths)
+  sublime.set_timeout(functools.partial(run_watched_tests, rekitRoot, generation + 1), WATCH_DEBOUNCE)
+
+def run_watched_tests(rekitRoot, generation):
+  if rekitRoot not in _watched_roots or _watch_saves.get(rekitRoot, (None,))[0] != generation:
+    return
+  paths = _watch_saves.pop(rekitRoot)[1]
+  targets = []
+  for path in paths:
+    testFile = get_test_file(path)
+    if testFile is not None and get_test_target(rekitRoot, testFile) not in targets:
+      targets.append(get_test_target(rekitRoot, testFile))
+  if not targets:
+    return
+  previous = _watch_runs.get(rekitRoot)
+  if previous is not None and previous.finished is None:
+    previous.cancel()
+  _watch_runs[rekitRoot] = run_tests(rekitRoot, targets)
+
+class RekitToggleWatchTestsCommand(sublime_plugin.WindowCommand):
+  def run(self, paths = []):
+    rekitRoot = get_command_root(self.window, paths)
+    if rekitRoot in _watched_roots:
+      _watched_roots.discard(rekitRoot)
+      sublime.status_message('Rekit: stopped watching tests')
+    else:
+      _watched_roots.add(rekitRoot)
+      sublime.status_message('Rekit: watching tests, saving a file runs its test')
+
+  def is_checked(self, paths = []):
+    return get_command_root(self.window, paths) in _watched_roots
+
+  def is_enabled(self, paths = []):
+    return get_command_root(self.window, paths) is not None
+
+  @profile.timed()
+  def is_visible(self, paths = []):
+    return not paths or classify(get_path(paths)).kind in ('root', 'test_folder')
+
+COVERAGE_TYPES = ('app', 'cli', '')
+
+_coverage_reports = {}
+
+def get_lcov_path(rekitRoot, reportType):
+  return os.path.join(rekitRoot, 'coverage', reportType, 'lcov.info').replace('\\', '/')
+
+def get_coverage_report(rekitRoot, reportType):
+  # parsed once per version of lcov.info, None if there is no report
+  lcovPath = get_lcov_path(rekitRoot, reportType)
+  try:
+    st = os.stat(lcovPath)
+  except OSError:
+    return None
+  key = (st.st_mtime, st.st_size)
+  cached = _coverage_reports.get(lcovPath)
+  if cached is None or cached[0] != key:
+    from .rekit import coverage
+    cached = _coverage_reports[lcovPath] = (key, coverage.CoverageReport(rekitRoot, lcovPath).parse())
+  return cached[1]
+
+# Whether a report exists, rechecked after CLASSIFY_TTL rather than on every menu render.
+_report_exists = {}
+
+def report_exists(path):
+  now = time.time()
+  cached = _report_exists.get(path)
+  if cached is None or now - cached[0] >= CLASSIFY_TTL:
+    cached = _report_exists[path] = (now, os.path.exists(path))
+  return cached[1]
+
+def get_coverage_type(path):
+  return {'app_test_folder': 'app', 'cli_test_folder': 'cli', 'test_folder': ''}.get(classify(path).kind)
+
+def format_percent(hit, found):
+  return '%.1f%%' % (hit * 100.0 / found) if found else 'n/a'
+
+def show_coverage_summary(rekitRoot, reportType):
+  report = get_coverage_report(rekitRoot, reportType)
+  if report is None:
+    show_rekit_output('No coverage report, run all tests first.')
+    return
+  linesFound, linesHit, branchesFound, branchesHit = report.get_totals()
+  show_rekit_output('Rekit coverage (%s): lines %s (%d/%d), branches %s (%d/%d)' % (report.lcovPath,
+    format_percent(linesHit, linesFound), linesHit, linesFound,
+    format_percent(branchesHit, branchesFound), branchesHit, branchesFound))
+  files = sorted([f for f in report.files.values() if f.lines_found], key=lambda f: f.lines_hit * 1.0 / f.lines_found)
+  for f in files[:20]:
+    show_rekit_output('  %7s lines  %7s branches  %s' % (format_percent(f.lines_hit, f.lines_found),
+      format_percent(f.branches_hit, f.branches_found), os.path.relpath(f.path, rekitRoot)))
+
 class RekitTestCoverageCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
-    p = get_path(paths)
-    rekitRoot = get_rekit_root(p)
-    reportType = ''
-    if is_app_test_folder(p):
-      reportType = 'app'
-    elif is_cli_test_folder(p):
-      reportType = 'cli'
-    reportPath = os.path.join(rekitRoot, 'coverage', reportType, 'lcov-report/index.html')
+    import webbrowser
+    reportPath = classify(get_path(paths)).coverage_report
     webbrowser.open('file://' + reportPath)
 
+  def is_enabled(self, paths = []):
+    reportPath = classify(get_path(paths)).coverage_report
+    return reportPath is not None and report_exists(reportPath)
+
+  @profile.timed()
+  def is_visible(self, paths = []):
+    return classify(get_path(paths)).coverage_report is not None
+
+class RekitCoverageSummaryCommand(sublime_plugin.WindowCommand):
+  def run(self, paths = []):
+    p = get_path(paths)
+    clear_rekit_output()
+    show_rekit_output_panel()
+    threading.Thread(target=show_coverage_summary, args=(get_rekit_root(p), get_coverage_type(p))).start()
+
   def is_enabled(self, paths = []):
     if not self.is_visible(paths):
       return False
     p = get_path(paths)
-    rekitRoot = get_rekit_root(p)
-    reportType = ''
-    if is_app_test_folder(p):
-      reportType = 'app'
-    elif is_cli_test_folder(p):
-      reportType = 'cli'
-    reportPath = os.path.join(rekitRoot, 'coverage', reportType, 'lcov-report/index.html')
-    return os.path.exists(reportPath)
+    return report_exists(get_lcov_path(get_rekit_root(p), get_coverage_type(p)))
 
+  @profile.timed()
   def is_visible(self, paths = []):
-    p = get_path(paths)
-    return is_test_folder(p) or is_app_test_folder(p) or is_cli_test_folder(p)
+    return get_coverage_type(get_path(paths)) is not None
+
+def update_coverage_gutter(view):
+  # marks the uncovered lines of a view, from the first report covering its file
+  view.erase_regions('rekit_coverage')
+  path = view.file_name()
+  if not path or not is_coverage_gutter_on():
+    return
+  path = path.replace('\\', '/')
+  rekitRoot = get_rekit_root(path)
+  if rekitRoot is None:
+    return
+  for reportType in COVERAGE_TYPES:
+    report = get_coverage_report(rekitRoot, reportType)
+    lines = report.get_uncovered_lines(path) if report is not None else None
+    if lines is not None:
+      regions = [view.line(view.text_point(line - 1, 0)) for line in lines]
+      view.add_regions('rekit_coverage', regions, 'region.redish', 'dot', sublime.HIDDEN | sublime.PERSISTENT)
+      return
+
+def update_coverage_gutters(views):
+  for view in views:
+    update_coverage_gutter(view)
+
+# [on, setting value it was read from]
+_coverage_gutter = []
+
+def is_coverage_gutter_on():
+  if not _coverage_gutter:
+    setting = bool(get_setting('coverage_gutter', False))
+    _coverage_gutter[:] = [setting, setting]
+  return _coverage_gutter[0]
+
+class RekitToggleCoverageGutterCommand(sublime_plugin.WindowCommand):
+  def run(self):
+    _coverage_gutter[0] = not is_coverage_gutter_on()
+    # the first update parses lcov.info, which can be tens of MB
+    sublime.set_timeout_async(functools.partial(update_coverage_gutters, self.window.views()), 0)
+
+  def is_checked(self):
+    return is_coverage_gutter_on()
+
+# Build output: webpack's own compile time and the emitted asset sizes, when printed.
+WEBPACK_TIME_RE = re.compile(r'^\s*Time:\s*(\d+)\s*ms')
+ASSET_SIZE_RE = re.compile(r'^\s*(\S+\.(?:js|css|html))\s+([\d.]+\s*[kKMG]?i?B)\b')
+BUILD_HISTORY_SIZE = 50
+
+def get_build_fingerprint(rekitRoot, folders=('src',)):
+  # mtime and size of everything under the folders plus package.json, hashed
+  import hashlib
+  h = hashlib.md5()
+  paths = [os.path.join(rekitRoot, 'package.json')]
+  for folder in folders:
+    for dirpath, dirnames, filenames in os.walk(os.path.join(rekitRoot, folder)):
+      dirnames.sort()
+      paths.extend(os.path.join(dirpath, f) for f in sorted(filenames))
+  for path in paths:
+    try:
+      st = os.stat(path)
+    except OSError:
+      continue
+    h.update(('%s|%s|%s\n' % (os.path.relpath(path, rekitRoot), st.st_mtime, st.st_size)).encode('utf8'))
+  return h.hexdigest()
+
+class BuildRun(object):
+  def __init__(self, rekitRoot, force=False):
+    self.rekitRoot = rekitRoot
+    self.force = force
+    self.fingerprint = None
+    self.started = None
+    self.firstOutput = None
+    self.webpackTime = None
+    self.assets = collections.OrderedDict()
+
+  def start(self):
+    threading.Thread(target=self.check).start()
+
+  def check(self):
+    self.fingerprint = get_build_fingerprint(self.rekitRoot)
+    last = load_cache_json(self.rekitRoot, 'build.json', {})
+    if not self.force and self.fingerprint == last.get('fingerprint'):
+      show_rekit_output('Build skipped: nothing changed in src/ since the last successful build (%s).' % last.get('date'))
+      show_rekit_output('Use "Rekit: Rebuild" to build anyway.')
+      return
+    self.started = time.time()
+    run_command(['node', './tools/build.js'], cwd=self.rekitRoot, on_line=self.on_line, on_exit=self.on_exit)
+
+  def on_line(self, line):
+    if self.firstOutput is None:
+      self.firstOutput = time.time() - self.started
+    line = matchers.ANSI_RE.sub('', line)
+    m = WEBPACK_TIME_RE.match(line)
+    if m:
+      self.webpackTime = int(m.group(1)) / 1000.0
+    m = ASSET_SIZE_RE.match(line)
+    if m:
+      self.assets[m.group(1)] = m.group(2)
+
+  def on_exit(self, code):
+    if code is None:
+      return
+    total = time.time() - self.started
+    data = load_cache_json(self.rekitRoot, 'build.json', {})
+    history = data.get('history', [])
+    show_rekit_output('')
+    show_rekit_output('Rekit: build %s in %.1fs (first output after %.1fs%s)' % (
+      'done' if code == 0 else 'failed', total, self.firstOutput or 0,
+      ', webpack %.1fs' % self.webpackTime if self.webpackTime is not None else ''))
+    if history:
+      average = sum(h['total'] for h in history[-5:]) / len(history[-5:])
+      show_rekit_output('  average of last %d builds: %.1fs (%+.0f%%)' % (len(history[-5:]), average, (total - average) * 100 / average))
+    for name, size in self.assets.items():
+      show_rekit_output('  %s: %s' % (name, size))
+    if code != 0:
+      return
+    history.append({
+      'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+      'total': round(total, 2),
+      'firstOutput': round(self.firstOutput or 0, 2),
+      'webpack': self.webpackTime,
+      'assets': self.assets,
+    })
+    save_cache_json(self.rekitRoot, 'build.json', {
+      'fingerprint': self.fingerprint,
+      'date': history[-1]['date'],
+      'history': history[-BUILD_HISTORY_SIZE:],
+    })
 
 class RekitBuildCommand(sublime_plugin.WindowCommand):
-  def run(self, paths = []):
-    p = get_path(paths)
-    rekitRoot = get_rekit_root(paths[0])
+  def run(self, paths = [], force = False):
+    rekitRoot = get_rekit_root(get_path(paths))
     clear_rekit_output()
     show_rekit_output_panel()
-    run_command(['node', './tools/build.js'], cwd=rekitRoot)
+    BuildRun(rekitRoot, force).start()
 
-  def is_visible(self, paths = []):
+  @profile.timed()
+  def is_visible(self, paths = [], force = False):
     p = get_path(paths)
     return is_rekit_root(p)
 
+class RekitShowBuildHistoryCommand(sublime_plugin.WindowCommand):
+  def run(self, paths = []):
+    history = load_cache_json(get_command_root(self.window, paths), 'build.json', {}).get('history', [])
+    clear_rekit_output()
+    show_rekit_output_panel()
+    show_rekit_output('Rekit build history (%d builds):' % len(history))
+    for h in reversed(history):
+      show_rekit_output('  %s  %6.1fs  first output %.1fs%s  %s' % (h['date'], h['total'], h['firstOutput'],
+        '  webpack %.1fs' % h['webpack'] if h.get('webpack') is not None else '',
+        ', '.join('%s %s' % (name, size) for name, size in h.get('assets', {}).items())))
+
+  def is_enabled(self, paths = []):
+    return get_command_root(self.window, paths) is not None
+
+  @profile.timed()
+  def is_visible(self, paths = []):
+    return not paths or is_rekit_root(get_path(paths))
+
+class RekitTestStatsCommand(sublime_plugin.WindowCommand):
+  def run(self, paths = []):
+    rekitRoot = get_command_root(self.window, paths)
+    clear_rekit_output()
+    show_rekit_output_panel()
+    threading.Thread(target=self.report, args=(rekitRoot,)).start()
+
+  def report(self, rekitRoot):
+    from .rekit import history
+    runs = history.load(os.path.join(get_cache_dir(rekitRoot), TEST_HISTORY))
+    stats = history.get_stats(runs)
+    show_rekit_output('Rekit test stats (%d runs, %d tests):' % (len(runs), len(stats)))
+    if not runs:
+      return
+    show_rekit_output('Slowest (median):')
+    for s in history.get_slowest(stats):
+      show_rekit_output('  %6dms  %s' % (s.median, s.title))
+    show_rekit_output('Getting slower (last %d runs against the ones before):' % history.TREND_RUNS)
+    for s in history.get_trending(stats):
+      show_rekit_output('  %6dms  %s (was %dms)' % (s.recent, s.title, s.before))
+    show_rekit_output('Flaky (passed and failed with the same sources):')
+    for s in history.get_flaky(stats):
+      show_rekit_output('  %d/%d failed  %s' % (s.failures, s.runs, s.title))
+
+  def is_enabled(self, paths = []):
+    return get_command_root(self.window, paths) is not None
+
+  @profile.timed()
+  def is_visible(self, paths = []):
+    return not paths or is_test_folder(get_path(paths))
+
+class RekitFindUsagesCommand(sublime_plugin.WindowCommand):
+  def run(self, paths = []):
+    path = get_path(paths)
+    threading.Thread(target=self.find, args=(path, classify(path))).start()
+
+  def find(self, path, c):
+    index = get_usage_index(c.root)
+    if not index.ready.is_set():
+      show_rekit_output('Indexing %s...' % c.root)
+      index.ready.wait()
+    usages = index.find(c.name, set([matchers.to_js_path(path)]))
+    main_thread(set_output_base_dir, c.root)
+    if not usages:
+      show_rekit_output('No usages of %s found.' % c.name)
+      return
+    show_rekit_output('%d usages of %s:' % (len(usages), c.name))
+    for u in usages:
+      show_rekit_output('  %s:%d: %s' % (os.path.relpath(u.path, c.root).replace('\\', '/'), u.line, u.text))
+
+  @profile.timed()
+  def is_visible(self, paths = []):
+    return len(paths) == 1 and classify(get_path(paths)).kind in ('component', 'page', 'action', 'async_action')
+
 class RekitShowOutputCommand(sublime_plugin.WindowCommand):
   def run(self, paths = []):
     show_rekit_output_panel()
 
+  @profile.timed()
   def is_visible(self, paths = []):
     p = get_path(paths)
     return is_rekit_root(p)
@@ -582,6 +2085,122 @@ class RekitClearOutputCommand(sublime_plugin.WindowCommand):
     rekitRoot = get_rekit_root(paths[0])
     clear_rekit_output()
 
+  @profile.timed()
   def is_visible(self, paths = []):
     p = get_path(paths)
     return is_rekit_root(p)
+
+FOLDER_COMMANDS = ('new_folder', 'delete_folder', 'rename_path', 'delete_file', 'refresh_folder_list')
+
+def index_window(window):
+  for root in get_window_roots(window):
+    get_project_index(root)
+    get_usage_index(root)
+
+def plugin_loaded():
+  get_settings()
+  on_settings_change()
+  # probe for node in the background, so the first command doesn't wait for it
+  threading.Thread(target=get_node_binary).start()
+  for window in sublime.windows():
+    index_window(window)
+
+class RekitEventListener(sublime_plugin.EventListener):
+  def on_load_project(self, window):
+    invalidate_rekit_root_cache()
+    index_window(window)
+
+  def on_post_window_command(self, window, command_name, args):
+    if command_name in FOLDER_COMMANDS:
+      invalidate_rekit_root_cache()
+      for root in get_window_roots(window):
+        refresh_project_index(root)
+
+  def on_post_save_async(self, view):
+    # saving actions.js re-reads its redux folder, kept off the UI thread
+    path = view.file_name()
+    if not path:
+      return
+    path = path.replace('\\', '/')
+    # Page.js template is one of the root markers
+    if os.path.basename(path) == 'Page.js':
+      invalidate_rekit_root_cache()
+    root = get_rekit_root(path)
+    if root is not None:
+      get_project_index(root).update(path)
+      if root in _usage_indexes and path.endswith('.js'):
+        _usage_indexes[root].update_file(path)
+      if root in _watched_roots:
+        watch_saved(root, path)
+
+  def on_activated_async(self, view):
+    if is_coverage_gutter_on():
+      update_coverage_gutter(view)
+
+  def on_pre_close_window(self, window):
+    others = set()
+    for w in sublime.windows():
+      if w.id() != window.id():
+        others.update(get_window_roots(w))
+    for root in get_window_roots(window):
+      if root not in others:
+        stop_node_worker(root)
+
+def plugin_unloaded():
+  for root in list(_workers.keys()):
+    stop_node_worker(root)
+  if _settings:
+    _settings[0].clear_on_change('rekit')
+    del _settings[:]
+
+class RekitCancelCommand(sublime_plugin.WindowCommand):
+  def run(self, paths = []):
+    scheduler.cancel()
+    show_rekit_output('Rekit commands cancelled.')
+
+  def is_enabled(self, paths = []):
+    return len(scheduler.running) + scheduler.queue_depth() > 0
+
+  @profile.timed()
+  def is_visible(self, paths = []):
+    return not paths or is_rekit_root(get_path(paths))
+
+class RekitShowJobsCommand(sublime_plugin.WindowCommand):
+  def run(self):
+    binary = get_node_binary()
+    if binary is None:
+      show_rekit_output('node: not found')
+    else:
+      show_rekit_output('node: %s (%s)' % (binary.path, binary.version or 'unknown version'))
+    for line in scheduler.report():
+      show_rekit_output(line)
+
+class RekitShowProfileCommand(sublime_plugin.WindowCommand):
+  def run(self, reset = False):
+    if not profile.enabled:
+      show_rekit_output('Profiling is off, set "profile": true in the Rekit settings to turn it on.')
+    lines = profile.report()
+    if len(lines) == 1:
+      show_rekit_output('No timings recorded yet.')
+    else:
+      for line in lines:
+        show_rekit_output(line)
+    if reset:
+      profile.reset()
+
+class RekitGotoElementCommand(sublime_plugin.WindowCommand):
+  def run(self):
+    elements = []
+    items = []
+    for root in get_window_roots(self.window):
+      e, i = get_project_index(root).get_quick_panel_items()
+      elements += e
+      items += i
+    self.window.show_quick_panel(items, functools.partial(self.on_done, elements))
+
+  def on_done(self, elements, index):
+    if index >= 0:
+      self.window.open_file(elements[index].path)
+
+  def is_enabled(self):
+    return len(get_window_roots(self.window)) > 0